@@ -5,10 +5,15 @@ Este módulo define a classe `Config`, responsável por centralizar, validar e g
 todas as configurações necessárias para a execução do pipeline de ETL.
 """
 
+import re
 from typing import Any, Dict
 
 from .exceptions import ConfigurationError
 
+# Formatos aceitos para o período de referência (ex.: 2025 e 7 ou 07).
+_YEAR_RE = re.compile(r"^\d{4}$")
+_MONTH_RE = re.compile(r"^(0?[1-9]|1[0-2])$")
+
 
 class Config:
     """Gerenciador de configurações do AutoSINAPI."""
@@ -24,6 +29,17 @@ class Config:
         "ALLOWED_LOCAL_FILE_EXTENSIONS": [".xlsx", ".xls"],
         "DOWNLOAD_FILENAME_TEMPLATE": "SINAPI_{type}_{month}_{year}",
         "DOWNLOAD_FILE_EXTENSION": ".zip",
+        "DOWNLOAD_CHUNK_SIZE": 1024 * 1024,
+        "DOWNLOAD_SPOOL_MAX_SIZE": 8 * 1024 * 1024,
+        "DOWNLOAD_RETRIES": 3,
+        "DOWNLOAD_BACKOFF_FACTOR": 0.5,
+        "DOWNLOAD_RETRY_STATUS_CODES": [502, 503, 504],
+        "DOWNLOAD_POOL_CONNECTIONS": 4,
+        "DOWNLOAD_POOL_MAXSIZE": 8,
+        "DOWNLOAD_CACHE_DIR": None,
+        # Fora do modo local, False extrai o conteúdo direto do download, sem
+        # gravar o .zip (que então não é reaproveitado em novas execuções).
+        "DOWNLOAD_KEEP_ZIP": True,
 
         # --- Constantes do ETL Pipeline ---
         "REFERENCE_FILE_KEYWORD": "Referência",
@@ -44,6 +60,11 @@ class Config:
         # --- Constantes do Pre-Processor ---
         "SHEETS_TO_CONVERT": ['CSD', 'CCD', 'CSE'],
         "PREPROCESSOR_CSV_SEPARATOR": ";",
+        # Processos usados na conversão; 1 converte as planilhas em sequência
+        # no próprio processo. Acima de 1 (opcional), um ProcessPoolExecutor é
+        # usado, e em plataformas "spawn" (Windows, macOS) o script chamador
+        # precisa estar protegido por `if __name__ == "__main__":`.
+        "PREPROCESSOR_MAX_WORKERS": 1,
 
         # --- Constantes do Processor ---
         "COMPOSICAO_ITENS_SHEET_KEYWORD": "Analítico",
@@ -69,7 +90,15 @@ class Config:
             "DESCRICAO_ITEM": "DESCRICAO", "UNIDADE_ITEM": "UNIDADE",
         },
 
+        # Tipos finais das colunas derivadas da planilha analítica, aplicados em um único astype.
+        "COMPOSICAO_ITENS_DTYPES": {
+            "composicao_pai_codigo": "Int64", "item_codigo": "Int64", "coeficiente": "float64",
+        },
+
         "HEADER_SEARCH_LIMIT": 20,
+        # Engine do pandas para ler as planilhas; None usa calamine quando o
+        # extra opcional `autosinapi[calamine]` está instalado, senão openpyxl.
+        "EXCEL_READ_ENGINE": None,
         "MANUTENCOES_SHEET_INDEX": 0,
         "MANUTENCOES_DATE_FORMAT": "%m/%Y",
         "COMPOSICAO_ITENS_HEADER_ROW": 9,
@@ -77,6 +106,8 @@ class Config:
         "CUSTOS_CODIGO_REGEX": r",(\d+)\)$",
         "UNPIVOT_VALUE_PRECO": "preco_mediano",
         "UNPIVOT_VALUE_CUSTO": "custo_total",
+        # Colunas de baixa cardinalidade das tabelas mensais guardadas como `category`.
+        "MONTHLY_CATEGORICAL_COLUMNS": ["uf", "regime"],
         "FINAL_CATALOG_COLUMNS": {
             "CODIGO": "codigo", "DESCRICAO": "descricao", "UNIDADE": "unidade"
         },
@@ -95,6 +126,17 @@ class Config:
         "DB_TEMP_TABLE_PREFIX": "temp_",
         "DB_DEFAULT_ITEM_STATUS": "ATIVO",
         "DB_POLICY_REPLACE": "substituir",
+        # False desliga o COPY no psycopg2: a carga passa ao `executemany` em
+        # lotes (`values_plus_batch`), útil onde o COPY não é permitido.
+        "DB_USE_COPY": True,
+        "DB_INSERT_CHUNK_SIZE": 10000,
+        "DB_EXECUTEMANY_BATCH_PAGE_SIZE": 500,
+        "DB_POOL_SIZE": 5,
+        "DB_POOL_MAX_OVERFLOW": 10,
+        "DB_POOL_RECYCLE": 1800,
+        "DB_CONNECT_TIMEOUT": 10,
+        "DB_CONNECT_RETRIES": 3,
+        "DB_RETRY_MAX_WAIT": 30,
     }
 
     REQUIRED_DB_KEYS = {"host", "port", "database", "user", "password"}
@@ -157,6 +199,10 @@ class Config:
         missing = self.REQUIRED_SINAPI_KEYS - set(config.keys())
         if missing:
             raise ConfigurationError(f"Configurações do SINAPI ausentes: {missing}")
+        if not _YEAR_RE.match(str(config["year"])):
+            raise ConfigurationError(f"Ano inválido: {config['year']}. Use o formato AAAA.")
+        if not _MONTH_RE.match(str(config["month"])):
+            raise ConfigurationError(f"Mês inválido: {config['month']}. Use um valor entre 1 e 12.")
         return config
 
     @property
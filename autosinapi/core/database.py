@@ -37,9 +37,10 @@ consistência dos dados.
           antes de inserir os novos dados (não implementado no código fornecido).
     - **Uso de Tabelas Temporárias:** Para operações de `append` e `upsert` em
       larga escala, os dados são primeiro carregados em uma tabela temporária
-      (com prefixo definido no `Config`) e depois transferidos para a tabela
-      final com uma única instrução SQL, garantindo melhor desempenho e
-      atomicidade.
+      `UNLOGGED` (com prefixo definido no `Config`, sem escrita no WAL) via
+      `COPY ... FROM STDIN` e depois
+      transferidos para a tabela final com uma única instrução SQL, garantindo
+      melhor desempenho e atomicidade.
 
 - **Saídas:**
     - A classe não retorna dados, mas modifica o estado do banco de dados,
@@ -48,15 +49,105 @@ consistência dos dados.
       execução de queries para que o pipeline possa tratar o erro.
 """
 
+import io
 import logging
-from typing import Any, Dict
+import random
+import time
+from typing import Any, Dict, Tuple
 
 import pandas as pd
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import URL, Engine
 
 from autosinapi.exceptions import DatabaseError
 
+# Engines compartilhados por URL de conexão e opções do engine, para que
+# instâncias distintas de `Database` reaproveitem o mesmo pool em vez de abrir
+# novas conexões. A senha e os ajustes de pool fazem parte da chave: uma senha
+# trocada ou outro `DB_POOL_*` criam um engine novo em vez de reusar o antigo.
+_ENGINE_CACHE: Dict[Tuple[URL, Tuple], Engine] = {}
+
+# Colunas da chave primária de uma tabela; o nome é passado como parâmetro.
+_PK_COLUMNS_QUERY = text("""
+    SELECT a.attname FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = CAST(:table_name AS regclass) AND i.indisprimary;
+""")
+
+
+# Linhas serializadas por bloco ao alimentar o `COPY ... FROM STDIN`.
+_COPY_CHUNK_ROWS = 50_000
+
+
+class _FrameCsvStream:
+    """
+    Arquivo somente-leitura que serializa um DataFrame em CSV sob demanda, um
+    bloco de linhas por vez, entregue ao `copy_expert` por `_copy_frame`.
+
+    O DataFrame em si já está em memória; o que o fluxo evita é manter também
+    o texto CSV de toda a carga, que só existe um bloco por vez.
+    """
+
+    def __init__(self, frame: pd.DataFrame, chunk_rows: int = _COPY_CHUNK_ROWS):
+        self._chunks = (
+            frame.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+            for start in range(0, len(frame), chunk_rows)
+        )
+        self._current = io.StringIO()
+
+    def read(self, size: int = -1) -> str:
+        data = self._current.read(size)
+        while not data:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return ""
+            self._current = io.StringIO(chunk)
+            data = self._current.read(size)
+        return data
+
+
+def _copy_frame(conn, data: pd.DataFrame, table_name: str):
+    """
+    Envia todas as linhas de `data` para `table_name` com `COPY ... FROM STDIN`
+    (psycopg2) em uma única ida ao servidor.
+
+    O cursor do driver é usado diretamente, sem passar pelo `to_sql`: o pandas
+    montaria antes os arrays de objetos de todo o DataFrame (`insert_data`),
+    que o COPY não usa. O DataFrame é serializado pelo escritor CSV do pandas
+    em blocos de linhas consumidos pelo próprio `COPY`.
+    """
+    columns = ", ".join(f'"{c}"' for c in data.columns)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(
+            f'COPY "{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)',
+            _FrameCsvStream(data),
+        )
+
+
+def _connection_url(
+    dialect: str, user: str, password: str, host: str, port: Any, database: str
+) -> URL:
+    """Monta a URL de conexão (o `URL` trata o escape de caracteres da senha)."""
+    return URL.create(
+        dialect,
+        username=user,
+        password=password,
+        host=host,
+        port=int(port),
+        database=database,
+    )
+
+
+def _engine_cache_key(url: URL, options: Dict[str, Any]) -> Tuple[URL, Tuple]:
+    """Chave do cache de engines: a URL completa e todas as opções do engine."""
+    frozen = tuple(
+        sorted(
+            (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+            for name, value in options.items()
+        )
+    )
+    return url, frozen
+
 
 class Database:
     def __init__(self, config):
@@ -66,20 +157,111 @@ class Database:
 
     def _create_engine(self) -> Engine:
         try:
-            url = (
-                f"{self.config.DB_DIALECT}://{self.config.DB_USER}:{self.config.DB_PASSWORD}@"
-                f"{self.config.DB_HOST}:{self.config.DB_PORT}/{self.config.DB_NAME}"
+            url = _connection_url(
+                self.config.DB_DIALECT,
+                self.config.DB_USER,
+                self.config.DB_PASSWORD,
+                self.config.DB_HOST,
+                self.config.DB_PORT,
+                self.config.DB_NAME,
             )
             self.logger.info(
                 f"Conectando ao banco de dados: "
                 f"{self.config.DB_DIALECT}://{self.config.DB_USER}:***@"
                 f"{self.config.DB_HOST}:{self.config.DB_PORT}/{self.config.DB_NAME}"
             )
-            return create_engine(url)
+            options = {
+                "pool_size": self.config.DB_POOL_SIZE,
+                "max_overflow": self.config.DB_POOL_MAX_OVERFLOW,
+                "pool_pre_ping": True,
+                "pool_recycle": self.config.DB_POOL_RECYCLE,
+                "connect_args": {"connect_timeout": self.config.DB_CONNECT_TIMEOUT},
+            }
+            if url.get_driver_name() == "psycopg2":
+                # Com `DB_USE_COPY` desligado, os `executemany` do `to_sql`
+                # viram INSERTs com várias linhas (VALUES) em lotes, em vez de
+                # um comando por linha.
+                options.update(
+                    executemany_mode="values_plus_batch",
+                    insertmanyvalues_page_size=self.config.DB_INSERT_CHUNK_SIZE,
+                    executemany_batch_page_size=self.config.DB_EXECUTEMANY_BATCH_PAGE_SIZE,
+                )
+            cache_key = _engine_cache_key(url, options)
+            engine = _ENGINE_CACHE.get(cache_key)
+            if engine is None:
+                engine = create_engine(url, **options)
+                _ENGINE_CACHE[cache_key] = engine
+            return engine
         except Exception as e:
             self.logger.error(f"Falha ao criar conexão com o banco de dados: {e}", exc_info=True)
             raise DatabaseError(f"Erro ao conectar com o banco de dados: {e}") from e
 
+    def _use_copy(self) -> bool:
+        """
+        Indica se a carga usa COPY (psycopg2, com `DB_USE_COPY` ligado) ou o
+        `executemany` do `to_sql`, que no psycopg2 segue em lotes de INSERTs
+        com várias linhas conforme as opções do engine.
+        """
+        return self.config.DB_USE_COPY and self._engine.dialect.driver == "psycopg2"
+
+    def _load_frame(self, conn, data: pd.DataFrame, table_name: str):
+        """
+        Carrega `data` em `table_name` dentro da transação de `conn`: com COPY
+        quando o driver permite e, nos demais, pelo `to_sql`, com as linhas em
+        lotes de `DB_INSERT_CHUNK_SIZE` no `executemany`.
+        """
+        if self._use_copy():
+            _copy_frame(conn, data, table_name)
+        else:
+            data.to_sql(
+                name=table_name, con=conn, if_exists="append", index=False,
+                chunksize=self.config.DB_INSERT_CHUNK_SIZE,
+            )
+
+    def _load_temp_table(
+        self, conn, data: pd.DataFrame, temp_table_name: str, table_name: str
+    ):
+        """
+        Carrega `data` na tabela temporária (ver `_load_frame`).
+
+        A tabela temporária copia a estrutura da tabela de destino (`LIKE`), de
+        modo que os tipos das colunas vêm do esquema em vez de serem inferidos
+        dos dtypes do DataFrame a cada carga. Ela é `UNLOGGED`: a carga não
+        passa pelo WAL, que só registra a transferência para a tabela final.
+        Cada instrução é enviada em um `execute` próprio, pois nem todo driver
+        aceita várias instruções em um único comando.
+        """
+        conn.execute(text(f'DROP TABLE IF EXISTS "{temp_table_name}"'))
+        conn.execute(text(
+            f'CREATE UNLOGGED TABLE "{temp_table_name}" (LIKE "{table_name}" INCLUDING DEFAULTS)'
+        ))
+        self._load_frame(conn, data, temp_table_name)
+
+    def test_connection(self, retries: int = None, max_wait: float = None):
+        """
+        Verifica a conexão com o banco, com backoff exponencial limitado e jitter
+        entre as tentativas para evitar novas tentativas sincronizadas.
+        """
+        retries = retries or self.config.DB_CONNECT_RETRIES
+        max_wait = max_wait or self.config.DB_RETRY_MAX_WAIT
+        for attempt in range(retries):
+            try:
+                with self._engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                self.logger.info("Conexão com o banco de dados verificada.")
+                return
+            except Exception as e:
+                if attempt < retries - 1:
+                    delay = min(max_wait, 2 ** attempt) * (0.5 + random.random() * 0.5)
+                    self.logger.warning(
+                        f"Falha ao conectar (tentativa {attempt + 1}/{retries}): {e}. "
+                        f"Nova tentativa em {delay:.1f}s."
+                    )
+                    time.sleep(delay)
+                else:
+                    self.logger.error(f"Falha ao conectar após {retries} tentativas: {e}", exc_info=True)
+                    raise DatabaseError(f"Erro ao conectar com o banco de dados: {e}") from e
+
     def create_tables(self):
         """Cria as tabelas do modelo de dados do SINAPI no banco."""
         drop_statements = f"""
@@ -131,20 +313,14 @@ class Database:
         UNION ALL
         SELECT composicao_pai_codigo, composicao_filho_codigo AS item_codigo, '{self.config.ITEM_TYPE_COMPOSICAO}' AS tipo_item, coeficiente FROM {self.config.DB_TABLE_COMPOSICAO_SUBCOMPOSICOES};
         """
-        trans = None 
         try:
-            with self._engine.connect() as conn:
-                trans = conn.begin()
+            # Todo o script vai ao servidor em uma única ida, dentro de uma
+            # transação (engine.begin faz commit ou rollback ao sair).
+            with self._engine.begin() as conn:
                 self.logger.info("Recriando o esquema do banco de dados...")
-                for stmt in drop_statements.split(";"):
-                    if stmt.strip(): conn.execute(text(stmt))
-                for stmt in ddl.split(";"):
-                    if stmt.strip(): conn.execute(text(stmt))
-                trans.commit()
+                conn.exec_driver_sql(drop_statements + ddl)
             self.logger.info("Esquema do banco de dados recriado com sucesso.")
         except Exception as e:
-            if trans: 
-                trans.rollback()
             self.logger.error(f"Erro ao recriar tabelas: {e}", exc_info=True)
             raise DatabaseError(f"Erro ao recriar as tabelas: {str(e)}") from e
 
@@ -172,91 +348,103 @@ class Database:
 
     def _append_data(self, data: pd.DataFrame, table_name: str):
         self.logger.info(f"Inserindo {len(data)} registros em '{table_name}' (política: append/ignore).")
+        try:
+            # Carga na tabela temporária e transferência na mesma transação:
+            # um único commit por tabela em vez de um por etapa.
+            with self._engine.begin() as conn:
+                self._insert_ignoring_duplicates(conn, data, table_name)
+        except Exception as e:
+            self.logger.error(f"Erro ao inserir dados em {table_name}: {e}", exc_info=True)
+            raise DatabaseError(f"Erro ao inserir dados em {table_name}: {str(e)}") from e
+
+    def _insert_ignoring_duplicates(self, conn, data: pd.DataFrame, table_name: str):
+        """
+        Carrega `data` em uma tabela temporária e a transfere para `table_name`,
+        deixando o próprio PostgreSQL descartar as linhas já existentes.
+        """
         temp_table_name = f"{self.config.DB_TEMP_TABLE_PREFIX}{table_name}"
-        with self._engine.connect() as conn:
-            data.to_sql(name=temp_table_name, con=conn, if_exists="replace", index=False)
-            pk_cols_query = text(f"""
-                SELECT a.attname FROM pg_index i
-                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-                WHERE i.indrelid = '{table_name}'::regclass AND i.indisprimary;
-            """)
-            trans = conn.begin()
-            try:
-                pk_cols_result = conn.execute(pk_cols_query).fetchall()
-                if not pk_cols_result:
-                    raise DatabaseError(f"Nenhuma chave primária encontrada para a tabela {table_name}.")
-                
-                pk_cols = [row[0] for row in pk_cols_result]
-                pk_cols_str = ", ".join(pk_cols)
-                cols = ", ".join([f'\"{c}\"' for c in data.columns])
-                
-                insert_query = f'''
-                    INSERT INTO \"{table_name}\" ({cols})
-                    SELECT {cols} FROM \"{temp_table_name}\" 
-                    ON CONFLICT ({pk_cols_str}) DO NOTHING;
-                '''
-                conn.execute(text(insert_query))
-                conn.execute(text(f'DROP TABLE "{temp_table_name}" CASCADE'))
-                trans.commit()
-            except Exception as e:
-                trans.rollback()
-                self.logger.error(f"Erro ao inserir dados em {table_name}: {e}", exc_info=True)
-                raise DatabaseError(f"Erro ao inserir dados em {table_name}: {str(e)}") from e
+        self._load_temp_table(conn, data, temp_table_name, table_name)
+        pk_cols_result = conn.execute(
+            _PK_COLUMNS_QUERY, {"table_name": table_name}
+        ).fetchall()
+        cols = ", ".join([f'\"{c}\"' for c in data.columns])
+
+        if pk_cols_result:
+            pk_cols_str = ", ".join(row[0] for row in pk_cols_result)
+            insert_query = f'''
+                INSERT INTO \"{table_name}\" ({cols})
+                SELECT {cols} FROM \"{temp_table_name}\" 
+                ON CONFLICT ({pk_cols_str}) DO NOTHING;
+            '''
+        else:
+            # Sem chave primária: descarta as linhas já existentes com EXCEPT
+            # ALL, que o PostgreSQL resolve com uma tabela hash (HashSetOp)
+            # sobre as linhas inteiras, em vez de comparar coluna a coluna
+            # para cada linha nova. Diferente de EXCEPT, o ALL mantém as
+            # linhas repetidas legítimas do próprio lote.
+            self.logger.warning(
+                f"Nenhuma chave primária encontrada para a tabela {table_name}. "
+                "Duplicatas serão filtradas comparando todas as colunas."
+            )
+            insert_query = f'''
+                INSERT INTO \"{table_name}\" ({cols})
+                SELECT {cols} FROM \"{temp_table_name}\"
+                EXCEPT ALL
+                SELECT {cols} FROM \"{table_name}\";
+            '''
+        conn.execute(text(insert_query))
+        conn.execute(text(f'DROP TABLE "{temp_table_name}" CASCADE'))
 
     def _replace_data(self, data: pd.DataFrame, table_name: str, year: str, month: str):
         self.logger.info(f"Substituindo dados em '{table_name}' para o período {year}-{month}.")
         delete_query = text(f'DELETE FROM "{table_name}" WHERE TO_CHAR(data_referencia, \'YYYY-MM\') = :ref')
-        with self._engine.connect() as conn:
-            trans = conn.begin()
-            try:
+        try:
+            with self._engine.begin() as conn:
                 conn.execute(delete_query, {"ref": f"{year}-{month}"})
-                data.to_sql(name=table_name, con=conn, if_exists="append", index=False)
-                trans.commit()
-            except Exception as e:
-                trans.rollback()
-                self.logger.error(f"Erro ao substituir dados em {table_name}: {e}", exc_info=True)
-                raise DatabaseError(f"Erro ao substituir dados: {str(e)}") from e
+                # Com o período já removido, a carga vai direto para a tabela
+                # final, sem tabela temporária nem ON CONFLICT: uma chave
+                # repetida nos dados do período aborta a substituição.
+                self._load_frame(conn, data, table_name)
+        except Exception as e:
+            self.logger.error(f"Erro ao substituir dados em {table_name}: {e}", exc_info=True)
+            raise DatabaseError(f"Erro ao substituir dados: {str(e)}") from e
 
     def _upsert_data(self, data: pd.DataFrame, table_name: str, pk_columns: list):
         self.logger.info(f"Executando UPSERT de {len(data)} registros em '{table_name}'.")
         temp_table_name = f"{self.config.DB_TEMP_TABLE_PREFIX}{table_name}"
-        with self._engine.connect() as conn:
-            data.to_sql(name=temp_table_name, con=conn, if_exists="replace", index=False)
-            cols = ", ".join([f'\"{c}\"' for c in data.columns])
-            pk_cols_str = ", ".join(pk_columns)
-            update_cols = ", ".join([f'\"{c}\" = EXCLUDED.\"{c}\"' for c in data.columns if c not in pk_columns])
-            
-            if not update_cols:
-                self._append_data(data, table_name)
-                return
+        cols = ", ".join([f'\"{c}\"' for c in data.columns])
+        pk_cols_str = ", ".join(pk_columns)
+        update_cols = ", ".join([f'\"{c}\" = EXCLUDED.\"{c}\"' for c in data.columns if c not in pk_columns])
 
-            query = f'''
-                INSERT INTO \"{table_name}\" ({cols})
-                SELECT {cols} FROM \"{temp_table_name}\" 
-                ON CONFLICT ({pk_cols_str}) DO UPDATE SET {update_cols};
-            '''
-            trans = conn.begin()
-            try:
+        if not update_cols:
+            self._append_data(data, table_name)
+            return
+
+        query = f'''
+            INSERT INTO \"{table_name}\" ({cols})
+            SELECT {cols} FROM \"{temp_table_name}\" 
+            ON CONFLICT ({pk_cols_str}) DO UPDATE SET {update_cols};
+        '''
+        try:
+            with self._engine.begin() as conn:
+                self._load_temp_table(conn, data, temp_table_name, table_name)
                 conn.execute(text(query))
                 conn.execute(text(f'DROP TABLE "{temp_table_name}" CASCADE'))
-                trans.commit()
-            except Exception as e:
-                trans.rollback()
-                self.logger.error(f"Erro no UPSERT para {table_name}: {e}", exc_info=True)
-                raise DatabaseError(f"Erro no UPSERT para {table_name}: {str(e)}") from e
+        except Exception as e:
+            self.logger.error(f"Erro no UPSERT para {table_name}: {e}", exc_info=True)
+            raise DatabaseError(f"Erro no UPSERT para {table_name}: {str(e)}") from e
 
-    def truncate_table(self, table_name: str):
-        self.logger.info(f"Limpando tabela: {table_name}")
-        query = f'TRUNCATE TABLE "{table_name}" RESTART IDENTITY CASCADE'
+    def truncate_table(self, *table_names: str):
+        """Limpa uma ou mais tabelas com um único TRUNCATE, em uma única transação."""
+        self.logger.info(f"Limpando tabela(s): {', '.join(table_names)}")
+        tables = ", ".join(f'"{name}"' for name in table_names)
+        query = f"TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE"
         try:
-            with self._engine.connect() as conn:
-                trans = conn.begin()
+            with self._engine.begin() as conn:
                 conn.execute(text(query))
-                trans.commit()
         except Exception as e:
-            trans.rollback()
-            self.logger.error(f"Falha ao truncar tabela {table_name}. Query: '{query}'", exc_info=True)
-            raise DatabaseError(f"Erro ao truncar a tabela {table_name}: {str(e)}") from e
+            self.logger.error(f"Falha ao truncar tabela(s) {tables}. Query: '{query}'", exc_info=True)
+            raise DatabaseError(f"Erro ao truncar a tabela {tables}: {str(e)}") from e
 
     def execute_query(self, query: str, params: Dict[str, Any] = None) -> pd.DataFrame:
         try:
@@ -269,18 +457,19 @@ class Database:
 
     def execute_non_query(self, query: str, params: Dict[str, Any] = None) -> int:
         try:
-            with self._engine.connect() as conn:
-                trans = conn.begin()
+            with self._engine.begin() as conn:
                 result = conn.execute(text(query), params or {})
-                trans.commit()
                 return result.rowcount
         except Exception as e:
-            trans.rollback()
             self.logger.error(f"Erro ao executar non-query. Query: '{query}'", exc_info=True)
             raise DatabaseError(f"Erro ao executar non-query: {str(e)}") from e
 
+    def close(self):
+        """Fecha as conexões do pool; o engine volta a conectar se for reutilizado."""
+        self._engine.dispose()
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._engine.dispose()
\ No newline at end of file
+        self.close()
\ No newline at end of file
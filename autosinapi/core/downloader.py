@@ -24,32 +24,55 @@ fornecido pelo usuário.
     - **Construção de URL:** Monta a URL completa para o download do arquivo
       `.zip` do SINAPI, utilizando o template e os parâmetros definidos no
       `Config`.
-    - **Requisição HTTP:** Gerencia uma sessão `requests` para realizar o
-      download do arquivo, tratando exceções de rede (como timeouts ou erros de
-      HTTP) de forma robusta.
+    - **Requisição HTTP:** Gerencia uma sessão `requests` reaproveitada entre
+      os downloads (pool de conexões e novas tentativas em erros 5xx
+      transitórios), tratando exceções de rede (como timeouts ou erros de
+      HTTP) de forma robusta. Opcionalmente (`DOWNLOAD_CACHE_DIR`), usa
+      requisições condicionais (ETag/Last-Modified) para não baixar de novo
+      um arquivo que não mudou.
     - **Leitura Local:** Valida se o arquivo local fornecido existe e se possui
       uma extensão permitida (definida no `Config`).
 
 - **Saídas:**
-    - O método `get_sinapi_data` retorna um objeto `BinaryIO` (especificamente
-      `io.BytesIO`), que é um stream de bytes do conteúdo do arquivo (seja ele
-      baixado ou lido localmente). Este formato é ideal para ser
+    - O método `get_sinapi_data` retorna um objeto `BinaryIO` (`io.BytesIO`
+      para arquivos locais e `SpooledTemporaryFile` para downloads, que passa
+      para o disco acima de um limite), que é um stream de bytes do conteúdo
+      do arquivo (seja ele baixado ou lido localmente). Este formato é ideal para ser
       consumido pelos próximos estágios do pipeline (como o `unzip` no
       `etl_pipeline.py`) sem a necessidade de salvar arquivos intermediários
       em disco, embora também suporte salvar o arquivo baixado se configurado.
 """
 
+import hashlib
+import json
 import logging
+import os
+import shutil
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-from typing import BinaryIO, Optional, Union
+from tempfile import SpooledTemporaryFile
+from typing import Any, BinaryIO, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..config import Config
 from ..exceptions import DownloadError
 
 
+@lru_cache(maxsize=32)
+def _format_url(
+    base_url: str, filename_template: str, extension: str, tipo: str, year: Any, month: Any
+) -> str:
+    """Monta a URL de download (ano com 4 dígitos e mês com 2)."""
+    file_name = filename_template.format(
+        type=tipo, month=str(month).zfill(2), year=str(year).zfill(4)
+    )
+    return f"{base_url}/{file_name}{extension}"
+
+
 class Downloader:
     """
     Classe responsável por obter os arquivos SINAPI, seja por download ou input direto.
@@ -61,9 +84,30 @@ class Downloader:
         """
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self._session = requests.Session()
+        self._session = self._create_session()
         self.logger.info("Downloader inicializado.")
 
+    def _create_session(self) -> requests.Session:
+        """
+        Cria a sessão HTTP compartilhada pelos downloads, com pool de conexões
+        (keep-alive) e novas tentativas para falhas transitórias do servidor.
+        """
+        retry = Retry(
+            total=self.config.DOWNLOAD_RETRIES,
+            backoff_factor=self.config.DOWNLOAD_BACKOFF_FACTOR,
+            status_forcelist=self.config.DOWNLOAD_RETRY_STATUS_CODES,
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=self.config.DOWNLOAD_POOL_CONNECTIONS,
+            pool_maxsize=self.config.DOWNLOAD_POOL_MAXSIZE,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
     def get_sinapi_data(
         self,
         file_path: Optional[Union[str, Path]] = None,
@@ -100,48 +144,150 @@ class Downloader:
     def _download_file(self, save_path: Optional[Path] = None) -> BinaryIO:
         """
         Realiza o download do arquivo SINAPI.
+
+        Com `DOWNLOAD_CACHE_DIR` definido, a requisição é condicional
+        (`If-None-Match`/`If-Modified-Since`): se o servidor responder 304, o
+        arquivo guardado no cache é reaproveitado sem baixar o corpo novamente.
         """
         try:
             url = self._build_url()
             self.logger.info(f"Realizando download de: {url}")
-            response = self._session.get(url, timeout=self.config.TIMEOUT)
-            response.raise_for_status()
-
-            content = BytesIO(response.content)
-            self.logger.info(f"Download de {url} concluído com sucesso ({len(content.getvalue())} bytes).")
+            cache_entry = self._read_cache_entry(url)
+            headers = {}
+            if cache_entry:
+                if cache_entry.get("etag"):
+                    headers["If-None-Match"] = cache_entry["etag"]
+                if cache_entry.get("last_modified"):
+                    headers["If-Modified-Since"] = cache_entry["last_modified"]
 
-            if self.config.is_local_mode and save_path:
-                self.logger.debug(f"Salvando arquivo baixado em: {save_path}")
-                save_path.write_bytes(response.content)
+            # Mantido em memória até DOWNLOAD_SPOOL_MAX_SIZE; acima disso, o
+            # conteúdo passa para um arquivo temporário em disco.
+            content = SpooledTemporaryFile(max_size=self.config.DOWNLOAD_SPOOL_MAX_SIZE)
+            target = part_path = None
+            try:
+                if self.config.is_local_mode and save_path:
+                    # Grava em um arquivo `.part` e só o renomeia para o nome
+                    # final com o download completo: uma falha no meio não
+                    # deixa um .zip vazio ou truncado para a próxima execução.
+                    save_path = Path(save_path)
+                    part_path = save_path.with_suffix(".part")
+                    self.logger.debug(f"Salvando arquivo baixado em: {save_path}")
+                    target = open(part_path, "wb")
+                # Grava os blocos à medida que chegam, sem manter uma segunda
+                # cópia completa do arquivo em memória (`response.content`).
+                with self._session.get(
+                    url, timeout=self.config.TIMEOUT, stream=True, headers=headers
+                ) as response:
+                    not_modified = cache_entry is not None and response.status_code == 304
+                    if not not_modified:
+                        response.raise_for_status()
+                        self._copy_chunks(
+                            response.iter_content(chunk_size=self.config.DOWNLOAD_CHUNK_SIZE),
+                            content,
+                            target,
+                        )
+                        if self.config.DOWNLOAD_CACHE_DIR:
+                            self._write_cache_entry(url, response.headers, content)
+                if not_modified:
+                    self.logger.info(f"Arquivo de {url} não foi alterado. Usando a cópia em cache.")
+                    with open(cache_entry["body_path"], "rb") as cached:
+                        chunks = iter(lambda: cached.read(self.config.DOWNLOAD_CHUNK_SIZE), b"")
+                        self._copy_chunks(chunks, content, target)
+                if target:
+                    target.close()
+                    os.replace(part_path, save_path)
+            except BaseException:
+                if target:
+                    target.close()
+                if part_path:
+                    part_path.unlink(missing_ok=True)
+                content.close()
+                raise
 
+            size = content.tell()
+            content.seek(0)
+            self.logger.info(f"Download de {url} concluído com sucesso ({size} bytes).")
             return content
 
         except requests.RequestException as e:
             self.logger.error(f"Falha no download de {url}: {e}", exc_info=True)
             raise DownloadError(f"Erro no download: {str(e)}")
 
+    @staticmethod
+    def _copy_chunks(chunks, content: BinaryIO, target: Optional[BinaryIO]):
+        """Grava os blocos no stream de retorno e, se houver, no arquivo de destino."""
+        for chunk in chunks:
+            if chunk:
+                content.write(chunk)
+                if target:
+                    target.write(chunk)
+
+    def _cache_paths(self, url: str) -> Tuple[Path, Path]:
+        """Caminhos do índice (JSON) e do corpo em cache para a URL."""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        cache_dir = Path(self.config.DOWNLOAD_CACHE_DIR)
+        return cache_dir / f"{key}.json", cache_dir / f"{key}{self.config.DOWNLOAD_FILE_EXTENSION}"
+
+    def _read_cache_entry(self, url: str) -> Optional[dict]:
+        if not self.config.DOWNLOAD_CACHE_DIR:
+            return None
+        index_path, body_path = self._cache_paths(url)
+        try:
+            entry = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not body_path.exists():
+            return None
+        entry["body_path"] = body_path
+        return entry
+
+    def _write_cache_entry(self, url: str, response_headers, content: BinaryIO):
+        """Guarda o corpo baixado e seus validadores (ETag/Last-Modified)."""
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        index_path, body_path = self._cache_paths(url)
+        try:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            content.seek(0)
+            with open(body_path, "wb") as f:
+                shutil.copyfileobj(content, f, self.config.DOWNLOAD_CHUNK_SIZE)
+            index_path.write_text(
+                json.dumps({"url": url, "etag": etag, "last_modified": last_modified}),
+                encoding="utf-8",
+            )
+            self.logger.debug(f"Download de {url} guardado no cache: {body_path}")
+        except OSError as e:
+            self.logger.warning(f"Não foi possível gravar o cache do download de {url}: {e}")
+
     def _build_url(self) -> str:
         """
         Constrói a URL do arquivo SINAPI com base nas configurações.
         """
-        ano = str(self.config.YEAR).zfill(4)
-        mes = str(self.config.MONTH).zfill(2)
-
         tipo = self.config.TYPE.upper()
         if tipo not in self.config.VALID_TYPES:
             raise ValueError(f"Tipo de planilha inválido: {tipo}")
 
-        # MODIFICADO: Usa template do config para o nome do arquivo e extensão
-        file_name = self.config.DOWNLOAD_FILENAME_TEMPLATE.format(type=tipo, month=mes, year=ano)
-        url = f"{self.config.BASE_URL}/{file_name}{self.config.DOWNLOAD_FILE_EXTENSION}"
-        
+        url = _format_url(
+            self.config.BASE_URL,
+            self.config.DOWNLOAD_FILENAME_TEMPLATE,
+            self.config.DOWNLOAD_FILE_EXTENSION,
+            tipo,
+            self.config.YEAR,
+            self.config.MONTH,
+        )
         self.logger.debug(f"URL construída: {url}")
 
         return url
 
+    def close(self):
+        """Fecha a sessão HTTP e suas conexões mantidas no pool."""
+        self.logger.debug("Fechando sessão HTTP do Downloader.")
+        self._session.close()
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.logger.debug("Fechando sessão HTTP do Downloader.")
-        self._session.close()
\ No newline at end of file
+        self.close()
\ No newline at end of file
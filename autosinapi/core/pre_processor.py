@@ -20,14 +20,19 @@ planilhas Excel complexas.
     - `output_dir (Path)`: O diretório onde os arquivos CSV resultantes serão
       salvos.
     - `config (Config)`: O objeto de configuração do pipeline, do qual extrai
-      parâmetros como o separador do CSV (`PREPROCESSOR_CSV_SEPARATOR`).
+      parâmetros como o separador do CSV (`PREPROCESSOR_CSV_SEPARATOR`) e o
+      número de processos (`PREPROCESSOR_MAX_WORKERS`).
 
 - **Transformações/Processos:**
-    - Itera sobre a lista de planilhas a serem convertidas.
-    - Para cada nome de planilha, lê os dados brutos do arquivo Excel
-      utilizando `pandas.read_excel`.
-    - Salva o conteúdo da planilha em um novo arquivo `.csv` no diretório de
-      saída especificado. O nome do arquivo CSV será o mesmo da planilha
+    - Converte as planilhas uma a uma no próprio processo. Com
+      `PREPROCESSOR_MAX_WORKERS` maior que 1 e mais de uma planilha, elas são
+      distribuídas entre processos (`ProcessPoolExecutor`), já que cada uma
+      pode ser lida de forma independente.
+    - Para cada nome de planilha, lê os dados brutos do arquivo Excel com o
+      `openpyxl` em modo somente leitura, linha a linha, preservando as
+      fórmulas.
+    - Grava as linhas, à medida que são lidas, em um novo arquivo `.csv` no
+      diretório de saída especificado. O nome do arquivo CSV será o mesmo da planilha
       (ex: `CSD.csv`).
     - Utiliza o separador definido no objeto `config` ao criar o arquivo CSV,
       garantindo consistência.
@@ -38,16 +43,76 @@ planilhas Excel complexas.
       serão consumidos posteriormente pela classe `Processor`.
 """
 
-import pandas as pd
+import csv
 import os
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import openpyxl
+
 from autosinapi.config import Config
 from autosinapi.exceptions import ProcessingError
 
 logger = logging.getLogger(__name__)
 
+
+def _trim_row(row: tuple) -> tuple:
+    """Remove as células vazias do fim da linha, como o leitor do pandas."""
+    end = len(row)
+    while end and (row[end - 1] is None or row[end - 1] == ""):
+        end -= 1
+    return row[:end]
+
+
+def _convert_sheet(xlsx_full_path: Path, sheet: str, csv_output_path: Path, sep: str) -> Path:
+    """Converte uma única planilha para CSV (no processo atual ou em um worker)."""
+    # Em modo read_only as linhas são lidas do XML e gravadas no CSV em fluxo,
+    # sem montar a planilha inteira em memória. data_only=False mantém as
+    # fórmulas, de onde o código das composições é extraído.
+    wb = openpyxl.load_workbook(xlsx_full_path, read_only=True, data_only=False)
+    part_path = csv_output_path.with_suffix(".part")
+    try:
+        ws = wb[sheet]
+        # A dimensão declarada no arquivo (<dimension ref>) pode estar
+        # desatualizada e, em modo read_only, cortaria linhas e colunas. Como
+        # no pandas, ela é descartada e as linhas vêm como estão no XML.
+        ws.reset_dimensions()
+        width, blank_rows, needs_padding = 0, 0, False
+        with open(part_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=sep, lineterminator="\n")
+            for row in ws.iter_rows(values_only=True):
+                row = _trim_row(row)
+                if not row:
+                    # Linhas vazias só são gravadas se vier outra com dados
+                    # depois delas: as do fim da planilha são descartadas.
+                    blank_rows += 1
+                    continue
+                if len(row) > width:
+                    needs_padding = needs_padding or f.tell() > 0
+                    width = len(row)
+                writer.writerows([("",) * width] * blank_rows)
+                blank_rows = 0
+                writer.writerow(row + ("",) * (width - len(row)))
+
+        if needs_padding:
+            # Uma linha mais larga apareceu depois de outras já gravadas:
+            # completa todas até a largura final, para um CSV retangular.
+            with open(part_path, newline="", encoding="utf-8") as src, open(
+                csv_output_path, "w", newline="", encoding="utf-8"
+            ) as dst:
+                writer = csv.writer(dst, delimiter=sep, lineterminator="\n")
+                for row in csv.reader(src, delimiter=sep):
+                    writer.writerow(row + [""] * (width - len(row)))
+            part_path.unlink()
+        else:
+            os.replace(part_path, csv_output_path)
+    finally:
+        wb.close()
+        part_path.unlink(missing_ok=True)
+    return csv_output_path
+
+
 def convert_excel_sheets_to_csv(
     xlsx_full_path: Path,
     sheets_to_convert: list[str],
@@ -56,6 +121,7 @@ def convert_excel_sheets_to_csv(
 ):
     """
     Converts specific sheets from an XLSX file to CSV, using settings from the config object.
+    Sheets are converted sequentially unless PREPROCESSOR_MAX_WORKERS > 1.
     """
     logger.info(f"Iniciando pré-processamento do arquivo: {xlsx_full_path}")
 
@@ -65,23 +131,38 @@ def convert_excel_sheets_to_csv(
     output_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"Diretório de saída para CSVs: {output_dir}")
 
-    for sheet in sheets_to_convert:
-        try:
+    sep = config.PREPROCESSOR_CSV_SEPARATOR
+    max_workers = min(len(sheets_to_convert), config.PREPROCESSOR_MAX_WORKERS)
+    if max_workers <= 1:
+        # Para as poucas planilhas convertidas, iniciar processos custa mais
+        # do que a própria leitura; o pool só é usado se configurado.
+        for sheet in sheets_to_convert:
+            logger.info(f"Processando planilha: '{sheet}'...")
+            try:
+                csv_output_path = _convert_sheet(
+                    xlsx_full_path, sheet, output_dir / f"{sheet}.csv", sep
+                )
+            except Exception as e:
+                raise ProcessingError(f"Falha ao processar a planilha '{sheet}'. Erro: {e}") from e
+            logger.info(f"Planilha '{sheet}' convertida com sucesso para '{csv_output_path}' (separador: {sep})")
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for sheet in sheets_to_convert:
             logger.info(f"Processando planilha: '{sheet}'...")
-            df = pd.read_excel(
-                xlsx_full_path,
-                sheet_name=sheet,
-                header=None,
-                engine='openpyxl',
-                engine_kwargs={'data_only': False}
+            future = executor.submit(
+                _convert_sheet, xlsx_full_path, sheet, output_dir / f"{sheet}.csv", sep
             )
-
-            csv_output_path = output_dir / f"{sheet}.csv"
-            df.to_csv(csv_output_path, index=False, header=False, sep=config.PREPROCESSOR_CSV_SEPARATOR)
-            logger.info(f"Planilha '{sheet}' convertida com sucesso para '{csv_output_path}' (separador: {config.PREPROCESSOR_CSV_SEPARATOR})")
-
-        except Exception as e:
-            raise ProcessingError(f"Falha ao processar a planilha '{sheet}'. Erro: {e}") from e
+            futures[future] = sheet
+
+        for future in as_completed(futures):
+            sheet = futures[future]
+            try:
+                csv_output_path = future.result()
+                logger.info(f"Planilha '{sheet}' convertida com sucesso para '{csv_output_path}' (separador: {sep})")
+            except Exception as e:
+                raise ProcessingError(f"Falha ao processar a planilha '{sheet}'. Erro: {e}") from e
 
 if __name__ == "__main__":
     # This part is for testing the module directly
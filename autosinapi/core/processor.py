@@ -52,37 +52,120 @@ prontos para serem carregados no banco de dados.
 import logging
 import re
 import unicodedata
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from ..config import Config
 from ..exceptions import ProcessingError
 
+# O calamine (leitor em Rust, bem mais rápido e econômico em memória que o
+# openpyxl) é um extra opcional: `pip install autosinapi[calamine]`.
+try:
+    import python_calamine  # noqa: F401
+
+    _DEFAULT_EXCEL_ENGINE = "calamine"
+except ImportError:
+    _DEFAULT_EXCEL_ENGINE = "openpyxl"
+
+_HEADER_SEPARATORS = str.maketrans({" ": "_", "\n": "_"})
+_NON_HEADER_CHARS_RE = re.compile(r"[^A-Z0-9_]")
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+
+
+# Os caches de normalização usam `typed=True`: cabeçalhos numéricos como 1 e
+# 1.0 são iguais como chave, mas `str()` os converte em "1" e "1.0".
+@lru_cache(maxsize=4096, typed=True)
+def _normalize_text(text_val) -> str:
+    """Normaliza um texto para comparação de cabeçalhos (sem acentos, maiúsculo)."""
+    s = str(text_val).strip()
+    # Caminho rápido: textos ASCII (a maioria das células) não têm acentos.
+    if not s.isascii():
+        s = "".join(
+            c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn"
+        )
+    return _NON_HEADER_CHARS_RE.sub("", s.upper().translate(_HEADER_SEPARATORS))
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _normalize_col_name(name) -> str:
+    """Normaliza um nome de coluna (sem acentos, maiúsculo, `_` como separador)."""
+    s = str(name).strip()
+    # Caminho rápido: nomes ASCII dispensam a decomposição dos acentos.
+    if not s.isascii():
+        s = unicodedata.normalize("NFD", s)
+    s = _WHITESPACE_RUN_RE.sub("_", s.upper())
+    if not s.isascii():
+        # Descarta as marcas combinantes (e demais caracteres não-ASCII).
+        s = s.encode("ascii", "ignore").decode("ascii")
+    return _NON_HEADER_CHARS_RE.sub("", s)
+
+
+def _normalize_col_names(columns) -> pd.Index:
+    """Normaliza todos os nomes de colunas de uma vez."""
+    return pd.Index([_normalize_col_name(col) for col in columns])
+
+
+def _usecols_by_normalized_name(wanted) -> Callable[[Any], bool]:
+    """Cria um filtro `usecols` que aceita colunas cujo nome normalizado está em `wanted`."""
+    wanted = set(wanted)
+    return lambda col: _normalize_col_name(col) in wanted
+
+
+def _clean_text_series(series: pd.Series) -> pd.Series:
+    """Padroniza uma coluna de texto (maiúsculas, sem espaços nas pontas) com operações vetorizadas."""
+    return series.astype("string").str.strip().str.upper()
+
+
+def _to_numeric(series: pd.Series, decimal_comma: bool = False) -> pd.Series:
+    """Converte uma coluna para numérico, pulando o trabalho se o dtype já for numérico."""
+    if series.dtype.kind in "iuf":
+        return series
+    numeric = pd.to_numeric(series, errors="coerce")
+    if decimal_comma:
+        # Só as células de texto que não converteram (ex.: "1,5") passam pela
+        # troca da vírgula; as já numéricas não fazem o caminho número -> texto.
+        pending = numeric.isna() & series.notna()
+        if pending.any():
+            numeric = numeric.astype("float64")
+            numeric[pending] = pd.to_numeric(
+                series[pending].astype(str).str.replace(",", ".", regex=False),
+                errors="coerce",
+            )
+    return numeric
+
 
 class Processor:
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.logger.info("Processador inicializado.")
+        self._excel_engine = config.EXCEL_READ_ENGINE or _DEFAULT_EXCEL_ENGINE
+        self.logger.info(f"Processador inicializado (engine Excel: {self._excel_engine}).")
+
+    def open_workbook(self, xlsx_path: str) -> pd.ExcelFile:
+        """
+        Abre o arquivo com a engine configurada. O `ExcelFile` pode ser
+        repassado (`xls=`) a `process_catalogo_e_precos` e
+        `process_composicao_itens`, para que o arquivo seja aberto uma única
+        vez; quem o abriu é responsável por fechá-lo.
+        """
+        return pd.ExcelFile(xlsx_path, engine=self._excel_engine)
+
+    def _workbook(self, xlsx_path: str, xls: Optional[pd.ExcelFile]):
+        """Usa o `ExcelFile` recebido, sem fechá-lo, ou abre um para `xlsx_path`."""
+        return nullcontext(xls) if xls is not None else self.open_workbook(xlsx_path)
 
     def _find_header_row(self, df: pd.DataFrame, keywords: List[str]) -> int:
         self.logger.debug(f"Procurando cabeçalho com keywords: {keywords}")
 
-        def normalize_text(text_val):
-            s = str(text_val).strip()
-            s = "".join(
-                c
-                for c in unicodedata.normalize("NFD", s)
-                if unicodedata.category(c) != "Mn"
-            )
-            s = re.sub(
-                r"[^A-Z0-9_]", "", s.upper().replace(" ", "_").replace("\n", "_")
-            )
-            return s
+        normalized_keywords = [_normalize_text(k) for k in keywords]
 
-        for i, row in df.iterrows():
+        # itertuples entrega tuplas simples, sem montar uma Series por linha.
+        for i, row in enumerate(df.itertuples(index=False, name=None)):
             if i > self.config.HEADER_SEARCH_LIMIT:
                 self.logger.warning(
                     f"Limite de busca por cabeçalho ({self.config.HEADER_SEARCH_LIMIT} linhas)"
@@ -92,11 +175,10 @@ class Processor:
 
             try:
                 row_values = [
-                    str(cell) if pd.notna(cell) else "" for cell in row.values
+                    str(cell) if pd.notna(cell) else "" for cell in row
                 ]
-                normalized_row_values = [normalize_text(cell) for cell in row_values]
+                normalized_row_values = [_normalize_text(cell) for cell in row_values]
                 row_str = " ".join(normalized_row_values)
-                normalized_keywords = [normalize_text(k) for k in keywords]
 
                 self.logger.debug(f"Linha {i} normalizada para busca: {row_str}")
 
@@ -115,18 +197,8 @@ class Processor:
 
     def _normalize_cols(self, df: pd.DataFrame) -> pd.DataFrame:
         self.logger.debug("Normalizando nomes das colunas...")
-        new_cols = {}
-        for col in df.columns:
-            s = str(col).strip()
-            s = "".join(
-                c
-                for c in unicodedata.normalize("NFD", s)
-                if unicodedata.category(c) != "Mn"
-            )
-            s = s.upper()
-            s = re.sub(r"[\s\n]+", "_", s)
-            s = re.sub(r"[^A-Z0-9_]", "", s)
-            new_cols[col] = s
+        normalized = _normalize_col_names(df.columns)
+        new_cols = dict(zip(df.columns, normalized))
 
         self.logger.debug(f"Mapeamento de colunas normalizadas: {new_cols}")
         return df.rename(columns=new_cols)
@@ -136,9 +208,8 @@ class Processor:
     ) -> pd.DataFrame:
         self.logger.debug(f"Iniciando unpivot para '{value_name}' com id_vars: {id_vars}")
 
-        uf_cols = [
-            col for col in df.columns if len(str(col)) == 2 and str(col).isalpha()
-        ]
+        col_names = df.columns.astype(str)
+        uf_cols = df.columns[(col_names.str.len() == 2) & col_names.str.isalpha()].tolist()
         if not uf_cols:
             self.logger.warning(
                 f"Nenhuma coluna de UF foi identificada para o unpivot"
@@ -148,11 +219,20 @@ class Processor:
 
         self.logger.debug(f"Colunas de UF identificadas para unpivot: {uf_cols}")
 
-        long_df = df.melt(
-            id_vars=id_vars, value_vars=uf_cols, var_name="uf", value_name=value_name
+        # Equivalente a `df.melt(...)`, montado direto dos arrays: as colunas
+        # de ID são repetidas por UF (tile), a UF por linha (repeat) e os
+        # valores achatados coluna a coluna, uma alocação por coluna de saída.
+        n_rows, n_ufs = len(df), len(uf_cols)
+        row_idx = np.tile(np.arange(n_rows), n_ufs)
+        long_df = pd.DataFrame(
+            {
+                **{col: df[col].array.take(row_idx) for col in id_vars},
+                "uf": np.repeat(np.asarray(uf_cols, dtype=object), n_rows),
+                value_name: df[uf_cols].to_numpy().reshape(-1, order="F"),
+            }
         )
         long_df = long_df.dropna(subset=[value_name])
-        long_df[value_name] = pd.to_numeric(long_df[value_name], errors="coerce")
+        long_df[value_name] = _to_numeric(long_df[value_name])
 
         self.logger.debug(f"DataFrame após unpivot. Head:\n{long_df.head().to_string()}")
         return long_df
@@ -168,16 +248,30 @@ class Processor:
     def process_manutencoes(self, xlsx_path: str) -> pd.DataFrame:
         self.logger.info(f"Processando arquivo de manutenções: {xlsx_path}")
         try:
-            df_raw = pd.read_excel(xlsx_path, sheet_name=self.config.MANUTENCOES_SHEET_INDEX, header=None)
-            header_row = self._find_header_row(
-                df_raw, self.config.MANUTENCOES_HEADER_KEYWORDS
-            )
-            if header_row is None:
-                raise ProcessingError(
-                    f"Cabeçalho não encontrado no arquivo de manutenções: {xlsx_path}"
+            # O arquivo é aberto uma única vez para a sondagem do cabeçalho e
+            # para a leitura completa.
+            with pd.ExcelFile(xlsx_path, engine=self._excel_engine) as xls:
+                # Só as primeiras linhas são necessárias para localizar o cabeçalho.
+                df_raw = pd.read_excel(
+                    xls,
+                    sheet_name=self.config.MANUTENCOES_SHEET_INDEX,
+                    header=None,
+                    nrows=self.config.HEADER_SEARCH_LIMIT + 1,
+                )
+                header_row = self._find_header_row(
+                    df_raw, self.config.MANUTENCOES_HEADER_KEYWORDS
+                )
+                if header_row is None:
+                    raise ProcessingError(
+                        f"Cabeçalho não encontrado no arquivo de manutenções: {xlsx_path}"
+                    )
+
+                df = pd.read_excel(
+                    xls,
+                    sheet_name=self.config.MANUTENCOES_SHEET_INDEX,
+                    header=header_row,
+                    usecols=_usecols_by_normalized_name(self.config.MANUTENCOES_COL_MAP),
                 )
-            
-            df = pd.read_excel(xlsx_path, sheet_name=self.config.MANUTENCOES_SHEET_INDEX, header=header_row)
             df = self._normalize_cols(df)
 
             col_map = self.config.MANUTENCOES_COL_MAP
@@ -188,11 +282,9 @@ class Processor:
             df["data_referencia"] = pd.to_datetime(
                 df["data_referencia"], errors="coerce", format=self.config.MANUTENCOES_DATE_FORMAT
             ).dt.date
-            df["item_codigo"] = pd.to_numeric(
-                df["item_codigo"], errors="coerce"
-            ).astype("Int64")
-            df["tipo_item"] = df["tipo_item"].str.upper().str.strip()
-            df["tipo_manutencao"] = df["tipo_manutencao"].str.upper().str.strip()
+            df["item_codigo"] = _to_numeric(df["item_codigo"]).astype("Int64")
+            text_cols = ["tipo_item", "tipo_manutencao"]
+            df[text_cols] = df[text_cols].apply(_clean_text_series)
 
             self.logger.info("Processamento de manutenções concluído com sucesso.")
             return df[list(col_map.values())]
@@ -203,44 +295,47 @@ class Processor:
             )
             raise ProcessingError(f"Erro em 'process_manutencoes': {e}") from e
 
-    def process_composicao_itens(self, xlsx_path: str) -> Dict[str, pd.DataFrame]:
+    def process_composicao_itens(
+        self, xlsx_path: str, xls: Optional[pd.ExcelFile] = None
+    ) -> Dict[str, pd.DataFrame]:
         self.logger.info(f"Processando estrutura de itens de composição de: {xlsx_path}")
         try:
-            xls = pd.ExcelFile(xlsx_path)
-            sheet_SINAPI_name = next((
-                s for s in xls.sheet_names if self.config.COMPOSICAO_ITENS_SHEET_KEYWORD in s and self.config.COMPOSICAO_ITENS_SHEET_EXCLUDE_KEYWORD not in s
-            ), None)
-            if not sheet_SINAPI_name:
-                raise ProcessingError(
-                    f"Aba '{self.config.COMPOSICAO_ITENS_SHEET_KEYWORD}' não encontrada no arquivo: {xlsx_path}"
-                )
+            # Reaproveita o workbook já aberto para ler a aba, em vez de
+            # abrir o arquivo uma segunda vez pelo caminho.
+            with self._workbook(xlsx_path, xls) as xls:
+                sheet_SINAPI_name = next((
+                    s for s in xls.sheet_names if self.config.COMPOSICAO_ITENS_SHEET_KEYWORD in s and self.config.COMPOSICAO_ITENS_SHEET_EXCLUDE_KEYWORD not in s
+                ), None)
+                if not sheet_SINAPI_name:
+                    raise ProcessingError(
+                        f"Aba '{self.config.COMPOSICAO_ITENS_SHEET_KEYWORD}' não encontrada no arquivo: {xlsx_path}"
+                    )
 
-            self.logger.info(f"Lendo aba de composição: {sheet_SINAPI_name}")
-            df = pd.read_excel(xlsx_path,
-                               sheet_name=sheet_SINAPI_name,
-                               header=self.config.COMPOSICAO_ITENS_HEADER_ROW
-                               )
+                self.logger.info(f"Lendo aba de composição: {sheet_SINAPI_name}")
+                df = pd.read_excel(xls,
+                                   sheet_name=sheet_SINAPI_name,
+                                   header=self.config.COMPOSICAO_ITENS_HEADER_ROW,
+                                   usecols=_usecols_by_normalized_name(
+                                       self.config.ORIGINAL_COLS.values()
+                                   ),
+                                   )
             df = self._normalize_cols(df)
 
             cols = self.config.ORIGINAL_COLS
-            subitens = df[
-                df[cols["TIPO_ITEM"]].str.upper().isin([
-                        self.config.ITEM_TYPE_INSUMO,
-                        self.config.ITEM_TYPE_COMPOSICAO
-                        ])
-            ].copy()
-
-            subitens["composicao_pai_codigo"] = pd.to_numeric(
-                subitens[cols["CODIGO_COMPOSICAO"]], errors="coerce"
-            ).astype("Int64")
-            subitens["item_codigo"] = pd.to_numeric(
-                subitens[cols["CODIGO_ITEM"]], errors="coerce"
-            ).astype("Int64")
-            subitens["tipo_item"] = subitens[cols["TIPO_ITEM"]].str.upper().str.strip()
-            subitens["coeficiente"] = pd.to_numeric(
-                subitens[cols["COEFICIENTE"]].astype(str).str.replace(",", "."),
-                errors="coerce",
-            )
+            # Uma única máscara separa as linhas de itens (insumo/composição)
+            # das linhas de composições-pai.
+            is_subitem = df[cols["TIPO_ITEM"]].str.upper().isin([
+                self.config.ITEM_TYPE_INSUMO,
+                self.config.ITEM_TYPE_COMPOSICAO,
+            ])
+            subitens = df[is_subitem]
+
+            subitens = subitens.assign(
+                composicao_pai_codigo=_to_numeric(subitens[cols["CODIGO_COMPOSICAO"]]),
+                item_codigo=_to_numeric(subitens[cols["CODIGO_ITEM"]]),
+                tipo_item=_clean_text_series(subitens[cols["TIPO_ITEM"]]),
+                coeficiente=_to_numeric(subitens[cols["COEFICIENTE"]], decimal_comma=True),
+            ).astype(self.config.COMPOSICAO_ITENS_DTYPES)
             subitens.rename(
                 columns={
                     cols["DESCRICAO_ITEM"]: "item_descricao", 
@@ -257,12 +352,10 @@ class Processor:
                 subset=["composicao_pai_codigo", "item_codigo", "tipo_item"]
             )
 
-            insumos_df = subitens[
-                subitens["tipo_item"] == self.config.ITEM_TYPE_INSUMO
-                ]
-            composicoes_df = subitens[
-                subitens["tipo_item"] == self.config.ITEM_TYPE_COMPOSICAO
-                ]
+            # Após o filtro acima, todo item que não é insumo é composição.
+            is_insumo = (subitens["tipo_item"] == self.config.ITEM_TYPE_INSUMO).to_numpy()
+            insumos_df = subitens[is_insumo]
+            composicoes_df = subitens[~is_insumo]
 
             self.logger.info(
                 f"Encontrados {len(insumos_df)} links insumo-composição"
@@ -276,40 +369,30 @@ class Processor:
                 ["composicao_pai_codigo", "item_codigo", "coeficiente"]
             ].rename(columns={"item_codigo": "composicao_filho_codigo"})
 
-            parent_composicoes_df = df[
-                df[cols["CODIGO_COMPOSICAO"]].notna()
-                & ~df[
-                    cols["TIPO_ITEM"]].str.upper().isin([
-                        self.config.ITEM_TYPE_INSUMO,
-                        self.config.ITEM_TYPE_COMPOSICAO
-                        ])
-            ].copy()
-            parent_composicoes_df = parent_composicoes_df.rename(
+            # Seleciona apenas as colunas usadas antes de renomear, evitando
+            # cópias completas do DataFrame da planilha analítica.
+            parent_mask = df[cols["CODIGO_COMPOSICAO"]].notna() & ~is_subitem
+            parent_composicoes_df = df.loc[
+                parent_mask,
+                [cols["CODIGO_COMPOSICAO"], cols["DESCRICAO_ITEM"], cols["UNIDADE_ITEM"]],
+            ].rename(
                 columns={
                     cols["CODIGO_COMPOSICAO"]: "codigo",
                     cols["DESCRICAO_ITEM"]: "descricao",
                     cols["UNIDADE_ITEM"]: "unidade",
                 }
-            )
-            parent_composicoes_df = parent_composicoes_df[
-                ["codigo", "descricao", "unidade"]
-            ].drop_duplicates(subset=["codigo"])
+            ).drop_duplicates(subset=["codigo"])
 
             child_item_details = subitens[
                 ["item_codigo", "tipo_item", "item_descricao", "item_unidade"]
-            ].copy()
-            child_item_details.rename(
+            ].rename(
                 columns={
                     "item_codigo": "codigo",
                     "tipo_item": "tipo",
                     "item_descricao": "descricao",
                     "item_unidade": "unidade",
-                },
-                inplace=True,
-            )
-            child_item_details = child_item_details.drop_duplicates(
-                subset=["codigo", "tipo"]
-            )
+                }
+            ).drop_duplicates(subset=["codigo", "tipo"])
 
             return {
                 self.config.DB_TABLE_COMPOSICAO_INSUMOS: composicao_insumos,
@@ -335,7 +418,7 @@ class Processor:
 
             catalogo_df = pd.DataFrame()
             if "CODIGO" in df.columns and "DESCRICAO" in df.columns:
-                catalogo_df = df[["CODIGO", "DESCRICAO", "UNIDADE"]].copy()
+                catalogo_df = df[["CODIGO", "DESCRICAO", "UNIDADE"]]
                 self.logger.debug(f"Extraídos {len(catalogo_df)} registros de catálogo da aba {sheet_name}.")
             
             long_df = self._unpivot_data(df, ["CODIGO"], self.config.UNPIVOT_VALUE_PRECO)
@@ -363,20 +446,18 @@ class Processor:
                 self.logger.warning(f"Cabeçalho não encontrado em {csv_path.name}. Pulando.")
                 return pd.DataFrame(), pd.DataFrame()
 
-            header_df = df_raw.iloc[header_row - 1 : header_row + 1].copy()
-
-            def clean_level0(val):
-                s_val = str(val)
-                return s_val if len(s_val) == 2 and s_val.isalpha() else pd.NA
-
-            header_df.iloc[0] = header_df.iloc[0].apply(clean_level0).ffill()
+            # Mantém apenas as siglas de UF (2 letras) no nível superior do
+            # cabeçalho e as propaga para as colunas seguintes.
+            level0 = df_raw.iloc[header_row - 1].astype(str)
+            is_uf = level0.str.len().eq(2) & level0.str.isalpha()
+            uf_level = level0.where(is_uf).ffill()
             new_cols = [
                 f"{h0}_{h1}" if pd.notna(h0) else str(h1)
-                for h0, h1 in zip(header_df.iloc[0], header_df.iloc[1])
+                for h0, h1 in zip(uf_level, df_raw.iloc[header_row])
             ]
-            df = df_raw.iloc[header_row + 1 :].copy()
+            # dropna já devolve um novo DataFrame; não é preciso copiar antes.
+            df = df_raw.iloc[header_row + 1 :].dropna(how="all")
             df.columns = new_cols
-            df.dropna(how="all", inplace=True)
 
             df = self._normalize_cols(df)
             df = self._standardize_id_columns(df)
@@ -389,17 +470,17 @@ class Processor:
 
             catalogo_df = pd.DataFrame()
             if "CODIGO" in df.columns and "DESCRICAO" in df.columns:
-                catalogo_df = df[["CODIGO", "DESCRICAO", "UNIDADE"]].copy()
-
-            cost_cols = {
-                col.split("_")[0]: col
-                for col in df.columns
-                if "CUSTO" in col and len(col.split("_")[0]) == 2
-            }
+                catalogo_df = df[["CODIGO", "DESCRICAO", "UNIDADE"]]
+
+            # Colunas "<UF>_CUSTO..." por UF, com o prefixo extraído uma única vez.
+            cost_cols = {}
+            for col in df.columns:
+                uf = col.partition("_")[0]
+                if "CUSTO" in col and len(uf) == 2:
+                    cost_cols[uf] = col
             if "CODIGO" in df.columns and cost_cols:
-                df_costs = df[["CODIGO"] + list(cost_cols.values())].copy()
-                df_costs = df_costs.rename(
-                    columns=lambda x: x.split("_")[0] if "CUSTO" in x else x
+                df_costs = df[["CODIGO"] + list(cost_cols.values())].rename(
+                    columns={col: uf for uf, col in cost_cols.items()}
                 )
                 long_df = self._unpivot_data(df_costs, ["CODIGO"], self.config.UNPIVOT_VALUE_CUSTO)
                 return long_df, catalogo_df
@@ -410,6 +491,17 @@ class Processor:
             self.logger.error(f"Erro ao processar aba de custos '{csv_path.name}': {e}", exc_info=True)
             raise ProcessingError(f"Erro em '_process_custos_sheet': {e}") from e
 
+    def _concat_monthly(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatena as abas de uma tabela mensal e converte UF/regime para
+        `category`, que repetem poucos valores em milhões de linhas.
+        """
+        df = pd.concat(frames, ignore_index=True)
+        categorical = [c for c in self.config.MONTHLY_CATEGORICAL_COLUMNS if c in df.columns]
+        if categorical:
+            df[categorical] = df[categorical].astype("category")
+        return df
+
     def _aggregate_final_dataframes(
         self, all_dfs: Dict, temp_insumos: List, temp_composicoes: List
     ) -> Dict:
@@ -436,67 +528,73 @@ class Processor:
             )
 
         if "precos_insumos_mensal" in all_dfs:
-            df_concat = pd.concat(all_dfs["precos_insumos_mensal"], ignore_index=True)
+            df_concat = self._concat_monthly(all_dfs["precos_insumos_mensal"])
             all_dfs["precos_insumos_mensal"] = df_concat
             self.logger.info(
                 f"Tabela de preços mensais finalizada com {len(df_concat)} registros."
             )
         if "custos_composicoes_mensal" in all_dfs:
-            df_concat = pd.concat(all_dfs["custos_composicoes_mensal"], ignore_index=True)
+            df_concat = self._concat_monthly(all_dfs["custos_composicoes_mensal"])
             all_dfs["custos_composicoes_mensal"] = df_concat
             self.logger.info(
                 f"Tabela de custos mensais finalizada com {len(df_concat)} registros."
             )
         return all_dfs
 
-    def process_catalogo_e_precos(self, xlsx_path: str) -> Dict[str, pd.DataFrame]:
+    def process_catalogo_e_precos(
+        self, xlsx_path: str, xls: Optional[pd.ExcelFile] = None
+    ) -> Dict[str, pd.DataFrame]:
         self.logger.info(
             f"Iniciando processamento completo de catálogos e preços de: {xlsx_path}"
         )
-        xls = pd.ExcelFile(xlsx_path)
         all_dfs = {}
         sheet_map = self.config.SHEET_MAP
         temp_insumos, temp_composicoes = [], []
+        # Uma única alternância de regex casa as chaves do SHEET_MAP em cada
+        # nome de aba, em vez de um teste de substring por chave.
+        sheet_key_re = re.compile("|".join(map(re.escape, sheet_map)))
+
+        with self._workbook(xlsx_path, xls) as xls:
+            for sheet_name in xls.sheet_names:
+                match = sheet_key_re.search(sheet_name)
+                if not match:
+                    continue
+                process_key = match.group(0)
+
+                try:
+                    process_type, regime = sheet_map[process_key]
+                    self.logger.info(
+                        f"Processando aba: '{sheet_name}' (tipo: {process_type}, regime: {regime})"
+                    )
 
-        for sheet_name in xls.sheet_names:
-            process_key = next((k for k in sheet_map if k in sheet_name), None)
-            if not process_key:
-                continue
-
-            try:
-                process_type, regime = sheet_map[process_key]
-                self.logger.info(
-                    f"Processando aba: '{sheet_name}' (tipo: {process_type}, regime: {regime})"
-                )
-
-                long_df, catalogo_df = pd.DataFrame(), pd.DataFrame()
-                if process_type == "precos":
-                    long_df, catalogo_df = self._process_precos_sheet(xls, sheet_name)
-                    if not catalogo_df.empty:
-                        temp_insumos.append(catalogo_df)
+                    long_df, catalogo_df = pd.DataFrame(), pd.DataFrame()
+                    if process_type == "precos":
+                        long_df, catalogo_df = self._process_precos_sheet(xls, sheet_name)
+                        if not catalogo_df.empty:
+                            temp_insumos.append(catalogo_df)
                 
-                elif process_type == "custos":
-                    long_df, catalogo_df = self._process_custos_sheet(
-                        xlsx_path, process_key
-                    )
-                    if not catalogo_df.empty:
-                        temp_composicoes.append(catalogo_df)
-
-                if not long_df.empty:
-                    long_df["regime"] = regime
-                    table, code = (
-                        ("precos_insumos_mensal", "insumo_codigo")
-                        if process_type == "precos"
-                        else ("custos_composicoes_mensal", "composicao_codigo")
+                    elif process_type == "custos":
+                        long_df, catalogo_df = self._process_custos_sheet(
+                            xlsx_path, process_key
+                        )
+                        if not catalogo_df.empty:
+                            temp_composicoes.append(catalogo_df)
+
+                    if not long_df.empty:
+                        long_df["regime"] = regime
+                        table, code = (
+                            ("precos_insumos_mensal", "insumo_codigo")
+                            if process_type == "precos"
+                            else ("custos_composicoes_mensal", "composicao_codigo")
+                        )
+                        long_df.rename(columns={"CODIGO": code}, inplace=True)
+                        all_dfs.setdefault(table, []).append(long_df)
+                        self.logger.info(f"Dados da aba '{sheet_name}' adicionados à chave '{table}'.")
+
+                except Exception as e:
+                    self.logger.error(
+                        f"Falha CRÍTICA ao processar a aba '{sheet_name}'. Esta aba será ignorada. Erro: {e}",
+                        exc_info=True,
                     )
-                    long_df.rename(columns={"CODIGO": code}, inplace=True)
-                    all_dfs.setdefault(table, []).append(long_df)
-                    self.logger.info(f"Dados da aba '{sheet_name}' adicionados à chave '{table}'.")
-
-            except Exception as e:
-                self.logger.error(
-                    f"Falha CRÍTICA ao processar a aba '{sheet_name}'. Esta aba será ignorada. Erro: {e}",
-                    exc_info=True,
-                )
         
         return self._aggregate_final_dataframes(all_dfs, temp_insumos, temp_composicoes)
\ No newline at end of file
@@ -51,10 +51,13 @@ import argparse
 import json
 import logging
 import os
+import shutil
 import uuid
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
 import pandas as pd
 
@@ -66,6 +69,7 @@ from autosinapi.core.processor import Processor
 from autosinapi.exceptions import (
     AutoSinapiError,
     ConfigurationError,
+    DatabaseError,
     ProcessingError,
 )
 
@@ -209,9 +213,24 @@ class PipelineETL:
             'mode': os.getenv('AUTOSINAPI_MODE', 'local')
         }
 
+    @staticmethod
+    def _list_files(directory: Path, extension: str) -> List[Path]:
+        """Lista os arquivos de `directory` com a extensão informada (sem diferenciar maiúsculas)."""
+        # os.scandir reaproveita o tipo de cada entrada retornado pelo sistema,
+        # evitando um stat por arquivo como em Path.glob. Arquivos de trava do
+        # Excel (~$...) e ocultos são descartados antes de qualquer leitura.
+        with os.scandir(directory) as entries:
+            return sorted(
+                Path(entry.path)
+                for entry in entries
+                if not entry.name.startswith(('~$', '.'))
+                and entry.is_file()
+                and entry.name.lower().endswith(extension)
+            )
+
     def _find_and_normalize_zip(self, download_path: Path, standardized_name: str) -> Path:
         self.logger.debug(f"Procurando por arquivo .zip em: {download_path}")
-        for file in download_path.glob('*.zip'):
+        for file in self._list_files(download_path, '.zip'):
             self.logger.debug(f"Arquivo .zip encontrado: {file.name}")
             if file.name.upper() != standardized_name.upper():
                 new_path = download_path / standardized_name
@@ -226,13 +245,46 @@ class PipelineETL:
             )
         return None
 
-    def _unzip_file(self, zip_path: Path) -> Path:
+    def _unzip_file(self, zip_path: Path, zip_content: Optional[BinaryIO] = None) -> Path:
+        """
+        Descompacta o .zip em um diretório com o mesmo nome do arquivo. Se
+        `zip_content` for informado, o conteúdo é lido dele em vez do disco.
+
+        Apenas as planilhas usadas pelo pipeline (Manutenções e Referência)
+        são extraídas; os demais arquivos do pacote não são descompactados.
+        """
         extraction_path = zip_path.parent / zip_path.stem
         self.logger.info(f"Descompactando '{zip_path.name}' para: {extraction_path}")
         extraction_path.mkdir(parents=True, exist_ok=True)
+        keywords = (self.config.MAINTENANCE_FILE_KEYWORD, self.config.REFERENCE_FILE_KEYWORD)
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extraction_path)
+            with zipfile.ZipFile(zip_path if zip_content is None else zip_content, 'r') as zip_ref:
+                members = [
+                    member for member in zip_ref.infolist()
+                    if not member.is_dir()
+                    and member.filename.lower().endswith('.xlsx')
+                    and any(keyword in member.filename for keyword in keywords)
+                ]
+                ignored = len(zip_ref.infolist()) - len(members)
+                if ignored:
+                    self.logger.debug(f"{ignored} entrada(s) do .zip não usada(s) pelo pipeline foram ignoradas.")
+                # Em novas execuções sobre o mesmo .zip, os arquivos já
+                # extraídos (mesmo tamanho e mesmo CRC-32 registrado no .zip)
+                # não são gravados de novo no disco.
+                pending = []
+                for member in members:
+                    target = extraction_path / member.filename
+                    if not (
+                        target.is_file()
+                        and target.stat().st_size == member.file_size
+                        and self._file_crc32(target) == member.CRC
+                    ):
+                        pending.append(member)
+                skipped = len(members) - len(pending)
+                for member in pending:
+                    zip_ref.extract(member, extraction_path)
+            if skipped:
+                self.logger.info(f"{skipped} arquivo(s) já extraído(s) anteriormente foram reaproveitados.")
             self.logger.info(f"Arquivo descompactado com sucesso em {extraction_path}")
             return extraction_path
         except zipfile.BadZipFile as e:
@@ -240,6 +292,15 @@ class PipelineETL:
                 f"O arquivo '{zip_path.name}' não é um zip válido ou está corrompido."
                 ) from e
 
+    @staticmethod
+    def _file_crc32(path: Path, chunk_size: int = 1024 * 1024) -> int:
+        """CRC-32 do arquivo, calculado em blocos (mesmo algoritmo do .zip)."""
+        crc = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
     def _execute_phase_1_acquisition(self, downloader: Downloader) -> Path:
         """
         Executa a Fase 1: Aquisição e descompactação dos dados do SINAPI.
@@ -249,7 +310,7 @@ class PipelineETL:
         month = str(self.config.MONTH).zfill(2)
         self.logger.info(f"[FASE 1] Iniciando obtenção de dados para {month}/{year}.")
         
-        download_path = Path(os.path.join(self.config.DOWNLOAD_DIR, f"{year}_{month}"))
+        download_path = Path(self.config.DOWNLOAD_DIR) / f"{year}_{month}"
         download_path.mkdir(parents=True, exist_ok=True)
         
         standardized_name = self.config.ZIP_FILENAME_TEMPLATE.format(year=year, month=month)
@@ -257,33 +318,52 @@ class PipelineETL:
         
         if not local_zip_path:
             self.logger.info("Arquivo não encontrado localmente. Iniciando download...")
-            file_content = downloader.get_sinapi_data(save_path=download_path)
             local_zip_path = download_path / standardized_name
-            with open(local_zip_path, 'wb') as f:
-                f.write(file_content.getbuffer())
+            # Em modo local o próprio Downloader grava os blocos no arquivo
+            # durante o download; nos demais, o stream é copiado em blocos.
+            with downloader.get_sinapi_data(save_path=local_zip_path) as file_content:
+                if not self.config.is_local_mode and not self.config.DOWNLOAD_KEEP_ZIP:
+                    # Extrai direto do conteúdo baixado, sem gravar o .zip e
+                    # relê-lo do disco.
+                    self.logger.info("Download concluído. Extraindo sem salvar o arquivo .zip.")
+                    extraction_path = self._unzip_file(local_zip_path, file_content)
+                    self.logger.info("[FASE 1] Obtenção de dados concluída com sucesso.")
+                    return extraction_path
+                if not self.config.is_local_mode:
+                    with open(local_zip_path, 'wb') as f:
+                        shutil.copyfileobj(file_content, f, self.config.DOWNLOAD_CHUNK_SIZE)
             self.logger.info(f"Download concluído e salvo em: {local_zip_path}")
         
         extraction_path = self._unzip_file(local_zip_path)
         self.logger.info("[FASE 1] Obtenção de dados concluída com sucesso.")
         return extraction_path
 
-    def _process_maintenance_data(self, processor: Processor, db: Database, file_path: Path) -> Tuple[int, str]:
+    def _process_maintenance_data(self, db: Database, manutencoes_df: pd.DataFrame) -> Tuple[int, str]:
         """
-        Processa e carrega os dados de manutenção, sincronizando o status dos catálogos.
+        Carrega os dados de manutenção já processados.
         Retorna o número de registros inseridos e o nome da tabela atualizada.
         """
-        self.logger.info(f"Processando arquivo de Manutenções: {file_path.name}")
-        manutencoes_df = processor.process_manutencoes(str(file_path))
-        
         if not manutencoes_df.empty:
             db.save_data(manutencoes_df, self.config.DB_TABLE_MANUTENCOES, policy=self.config.DB_POLICY_APPEND)
-            self.logger.info(f"{len(manutencoes_df)} registros de manutenção carregados. Sincronizando status...")
-            self._sync_catalog_status(db)
+            self.logger.info(f"{len(manutencoes_df)} registros de manutenção carregados.")
             return len(manutencoes_df), self.config.DB_TABLE_MANUTENCOES
         
         self.logger.info("Nenhum dado de manutenção para processar.")
         return 0, None
 
+    def _build_placeholders(self, codes: List, details_df: pd.DataFrame, desc_template: str) -> pd.DataFrame:
+        """
+        Monta os registros de catálogo para `codes`, usando a descrição e a unidade
+        de `details_df` (indexado por código) quando disponíveis.
+        """
+        found = details_df[~details_df.index.duplicated()].reindex(codes)
+        placeholder_desc = pd.Series([desc_template.format(code=code) for code in codes], index=found.index)
+        return pd.DataFrame({
+            'codigo': codes,
+            'descricao': found['descricao'].fillna(placeholder_desc).to_numpy(),
+            'unidade': found['unidade'].fillna(self.config.DEFAULT_PLACEHOLDER_UNIT).to_numpy(),
+        })
+
     def _handle_missing_items_placeholders(self, processed_data: Dict, structure_dfs: Dict) -> Dict:
         """
         Verifica inconsistências de dados e cria placeholders para itens ausentes.
@@ -291,23 +371,19 @@ class PipelineETL:
         """
         # Tratamento para insumos ausentes
         existing_insumos_df = processed_data.get('insumos', pd.DataFrame(columns=['codigo', 'descricao', 'unidade']))
-        all_child_insumo_codes = structure_dfs[self.config.DB_TABLE_COMPOSICAO_INSUMOS]['insumo_filho_codigo'].unique()
-        existing_insumo_codes_set = set(existing_insumos_df['codigo'].values)
-        missing_insumo_codes = [code for code in all_child_insumo_codes if code not in existing_insumo_codes_set]
+        all_child_insumo_codes = pd.Series(structure_dfs[self.config.DB_TABLE_COMPOSICAO_INSUMOS]['insumo_filho_codigo'].unique())
+        missing_insumo_codes = all_child_insumo_codes[~all_child_insumo_codes.isin(existing_insumos_df['codigo'])].tolist()
         
         if missing_insumo_codes:
             self.logger.warning(f"Encontrados {len(missing_insumo_codes)} insumos na estrutura que não estão no catálogo. Criando placeholders...")
             insumo_details_df = structure_dfs['child_item_details'][
                         (structure_dfs['child_item_details']['codigo'].isin(missing_insumo_codes)) &
                         (structure_dfs['child_item_details']['tipo'] == self.config.ITEM_TYPE_INSUMO)
-                    ].drop_duplicates(subset=['codigo']).set_index('codigo')
+                    ].set_index('codigo')
 
-            missing_insumos_data = {
-                'codigo': missing_insumo_codes,
-                'descricao': [insumo_details_df.loc[code, 'descricao'] if code in insumo_details_df.index else self.config.PLACEHOLDER_INSUMO_DESC_TEMPLATE.format(code=code) for code in missing_insumo_codes],
-                'unidade': [insumo_details_df.loc[code, 'unidade'] if code in insumo_details_df.index else self.config.DEFAULT_PLACEHOLDER_UNIT for code in missing_insumo_codes]
-            }
-            missing_insumos_df = pd.DataFrame(missing_insumos_data)
+            missing_insumos_df = self._build_placeholders(
+                missing_insumo_codes, insumo_details_df, self.config.PLACEHOLDER_INSUMO_DESC_TEMPLATE
+            )
             processed_data['insumos'] = pd.concat([existing_insumos_df, missing_insumos_df], ignore_index=True)
 
         # Tratamento para composições ausentes
@@ -323,16 +399,13 @@ class PipelineETL:
 
         if missing_composicao_codes:
             self.logger.warning(f"Encontradas {len(missing_composicao_codes)} composições na estrutura que não estão no catálogo. Criando placeholders...")
-            def get_detail(code, column):
-                if code in parent_codes.index: return parent_codes.loc[code, column]
-                if code in child_codes.index: return child_codes.loc[code, column]
-                return self.config.PLACEHOLDER_COMPOSICAO_DESC_TEMPLATE.format(code=code) if column == 'descricao' else self.config.DEFAULT_PLACEHOLDER_UNIT
-
-            missing_composicoes_df = pd.DataFrame({
-                'codigo': missing_composicao_codes,
-                'descricao': [get_detail(code, 'descricao') for code in missing_composicao_codes],
-                'unidade': [get_detail(code, 'unidade') for code in missing_composicao_codes]
-            })
+            # Detalhes da composição pai têm precedência sobre os da composição filha.
+            composicao_details_df = pd.concat([
+                parent_codes[['descricao', 'unidade']], child_codes[['descricao', 'unidade']]
+            ])
+            missing_composicoes_df = self._build_placeholders(
+                missing_composicao_codes, composicao_details_df, self.config.PLACEHOLDER_COMPOSICAO_DESC_TEMPLATE
+            )
             processed_data['composicoes'] = pd.concat([existing_composicoes_df, missing_composicoes_df], ignore_index=True)
             
         return processed_data
@@ -356,8 +429,10 @@ class PipelineETL:
                 records_loaded += len(df)
 
         # Carrega estrutura
-        db.truncate_table(self.config.DB_TABLE_COMPOSICAO_INSUMOS)
-        db.truncate_table(self.config.DB_TABLE_COMPOSICAO_SUBCOMPOSICOES)
+        db.truncate_table(
+            self.config.DB_TABLE_COMPOSICAO_INSUMOS,
+            self.config.DB_TABLE_COMPOSICAO_SUBCOMPOSICOES,
+        )
         
         for structure_name in [self.config.DB_TABLE_COMPOSICAO_INSUMOS, self.config.DB_TABLE_COMPOSICAO_SUBCOMPOSICOES]:
             if structure_name in structure_dfs and not structure_dfs[structure_name].empty:
@@ -410,13 +485,20 @@ class PipelineETL:
         SET status = 'DESATIVADO'
         WHERE codigo IN (
             SELECT item_codigo FROM latest_maintenance
-            WHERE rn = 1 AND tipo_item = '{{item_type}}' AND tipo_manutencao ILIKE '{self.config.MAINTENANCE_DEACTIVATION_KEYWORD}'
+            WHERE rn = 1 AND tipo_item = :item_type AND tipo_manutencao ILIKE :keyword
         );
         """
+        keyword = self.config.MAINTENANCE_DEACTIVATION_KEYWORD
         try:
-            num_insumos_updated = db.execute_non_query(sql_update.format(table=self.config.DB_TABLE_INSUMOS, item_type=self.config.ITEM_TYPE_INSUMO))
+            num_insumos_updated = db.execute_non_query(
+                sql_update.format(table=self.config.DB_TABLE_INSUMOS),
+                {"item_type": self.config.ITEM_TYPE_INSUMO, "keyword": keyword},
+            )
             self.logger.info(f"Status do catálogo de insumos sincronizado. Itens desativados: {num_insumos_updated}")
-            num_composicoes_updated = db.execute_non_query(sql_update.format(table=self.config.DB_TABLE_COMPOSICOES, item_type=self.config.ITEM_TYPE_COMPOSICAO))
+            num_composicoes_updated = db.execute_non_query(
+                sql_update.format(table=self.config.DB_TABLE_COMPOSICOES),
+                {"item_type": self.config.ITEM_TYPE_COMPOSICAO, "keyword": keyword},
+            )
             self.logger.info(f"Status do catálogo de composições sincronizado. Itens desativados: {num_composicoes_updated}")
         except Exception as e:
             self.logger.error(f"Erro ao sincronizar status dos catálogos: {e}", exc_info=True)
@@ -431,6 +513,7 @@ class PipelineETL:
         records_inserted = 0
         status = self.config.STATUS_FAILURE
         message = "Ocorreu um erro inesperado."
+        downloader = db = None
 
         try:
             self.logger.info("Configuração validada com sucesso.")
@@ -440,6 +523,7 @@ class PipelineETL:
 
             # Fase 0: Preparação do Banco de Dados
             self.logger.info("[FASE 0] Preparando banco de dados...")
+            db.test_connection()
             db.create_tables()
             self.logger.info("[FASE 0] Banco de dados preparado com sucesso.")
 
@@ -448,21 +532,45 @@ class PipelineETL:
 
             # Fase 2: Processamento de Arquivos
             self.logger.info("[FASE 2] Iniciando processamento dos arquivos.")
-            all_excel_files = list(extraction_path.glob('*.xlsx'))
+            all_excel_files = self._list_files(extraction_path, '.xlsx')
             if not all_excel_files:
                 raise ProcessingError(f"Nenhum arquivo .xlsx encontrado em {extraction_path}")
 
             manutencoes_file_path = next((f for f in all_excel_files if self.config.MAINTENANCE_FILE_KEYWORD in f.name), None)
             referencia_file_path = next((f for f in all_excel_files if self.config.REFERENCE_FILE_KEYWORD in f.name), None)
 
-            # Processa manutenções (se existirem)
-            if manutencoes_file_path:
-                count, table = self._process_maintenance_data(processor, db, manutencoes_file_path)
-                if table:
-                    records_inserted += count
-                    tables_updated.append(table)
-            else:
-                self.logger.warning("Arquivo de Manutenções não encontrado. Sincronização de status pulada.")
+            # Com PREPROCESSOR_MAX_WORKERS > 1 o pré-processamento usa um pool
+            # de processos: ele termina antes de qualquer thread ser criada,
+            # para que nenhum processo filho herde locks mantidos por threads.
+            if referencia_file_path:
+                self._run_pre_processing(referencia_file_path, extraction_path)
+
+            # O arquivo de Manutenções é lido em uma thread à parte, enquanto
+            # esta thread lê o de Referência.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                manutencoes_future = None
+                if manutencoes_file_path:
+                    self.logger.info(f"Processando arquivo de Manutenções: {manutencoes_file_path.name}")
+                    manutencoes_future = executor.submit(processor.process_manutencoes, str(manutencoes_file_path))
+
+                if referencia_file_path:
+                    # O workbook de Referência é aberto uma única vez e lido em
+                    # sequência por catálogo/preços e estrutura: as strings
+                    # compartilhadas são carregadas uma vez e o mesmo ExcelFile
+                    # nunca é usado por duas threads ao mesmo tempo.
+                    referencia = str(referencia_file_path)
+                    with processor.open_workbook(referencia) as referencia_xls:
+                        processed_data = processor.process_catalogo_e_precos(referencia, xls=referencia_xls)
+                        structure_dfs = processor.process_composicao_itens(referencia, xls=referencia_xls)
+
+                # Processa manutenções (se existirem)
+                if manutencoes_future:
+                    count, table = self._process_maintenance_data(db, manutencoes_future.result())
+                    if table:
+                        records_inserted += count
+                        tables_updated.append(table)
+                else:
+                    self.logger.warning("Arquivo de Manutenções não encontrado. Sincronização de status pulada.")
 
             # Processa arquivo de referência (se existir)
             if not referencia_file_path:
@@ -470,11 +578,6 @@ class PipelineETL:
                 status = self.config.STATUS_SUCCESS_NO_DATA
                 message = "Pipeline finalizado sem dados para processar."
             else:
-                self._run_pre_processing(referencia_file_path, extraction_path)
-                
-                processed_data = processor.process_catalogo_e_precos(str(referencia_file_path))
-                structure_dfs = processor.process_composicao_itens(str(referencia_file_path))
-                
                 processed_data = self._handle_missing_items_placeholders(processed_data, structure_dfs)
                 
                 self.logger.info("[FASE 2] Processamento de arquivos concluído.")
@@ -484,6 +587,11 @@ class PipelineETL:
                 count, tables = self._execute_phase_3_load_data(db, processed_data, structure_dfs, data_referencia)
                 records_inserted += count
                 tables_updated.extend(tables)
+
+                # O status só pode ser sincronizado depois que os catálogos foram
+                # carregados; antes disso as tabelas recém-criadas estão vazias.
+                if self.config.DB_TABLE_MANUTENCOES in tables_updated:
+                    self._sync_catalog_status(db)
                 
                 status = self.config.STATUS_SUCCESS
                 message = "Dados populados com sucesso."
@@ -495,6 +603,12 @@ class PipelineETL:
             self.logger.critical(f"Ocorreu um erro inesperado e fatal no pipeline: {e}", exc_info=True)
             message = f"Erro inesperado: {e}"
         finally:
+            # Um único engine/sessão é usado em toda a execução e liberado aqui.
+            if db is not None:
+                db.close()
+            if downloader is not None:
+                downloader.close()
+
             # --- Sumário da Execução ---
             self.logger.info("=" * 50)
             self.logger.info(f"=========   PIPELINE FINALIZADO (Run ID: {self.run_id})   =========")
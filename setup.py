@@ -19,6 +19,9 @@ setup(
         'pytest-mock>=3.10.0',
         'pytest-cov>=4.0.0',
     ],
+    extras_require={
+        'calamine': ['python-calamine'],  # Leitor XLSX nativo (engine 'calamine' do pandas)
+    },
     python_requires='>=3.8',  # Atualizado para versão mais moderna
     author="Lucas Antonio M. Pereira",
     author_email="contato@mundoaec.com",
@@ -6,5 +6,24 @@
 import os
 import sys
 
+import pytest
+
 # Adiciona a raiz do projeto ao sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--runslow", action="store_true", default=False,
+        help="executa também os testes marcados como slow",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Pula os testes marcados como `slow`, a menos que `--runslow` seja informado."""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="teste lento: use --runslow para executá-lo")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
@@ -2,8 +2,7 @@
 Testes unitários para o módulo de download.
 """
 
-from io import BytesIO
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 import requests
@@ -35,8 +34,9 @@ def sinapi_config():
 @pytest.fixture
 def mock_response():
     """Fixture para mock de resposta HTTP."""
-    response = Mock()
-    response.content = b"test content"
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda chunk_size: iter([b"test ", b"content"])
     response.raise_for_status = Mock()
     return response
 
@@ -95,8 +95,7 @@ def test_successful_download(mock_session, valid_db_config, sinapi_config, mock_
     downloader = Downloader(config)
 
     result = downloader.get_sinapi_data()
-    assert isinstance(result, BytesIO)
-    assert result.getvalue() == b"test content"
+    assert result.read() == b"test content"
     session.get.assert_called_once()
 
 
@@ -131,11 +130,80 @@ def test_local_mode_save(mock_session, valid_db_config, sinapi_config, mock_resp
     
     assert save_path.exists()
     assert save_path.read_bytes() == b"test content"
-    assert isinstance(result, BytesIO)
-    assert result.getvalue() == b"test content"
+    assert result.read() == b"test content"
+
+
+@patch("autosinapi.core.downloader.requests.Session")
+def test_local_mode_failed_download_leaves_no_file(
+    mock_session, valid_db_config, sinapi_config, mock_response, tmp_path
+):
+    """Um download que falha não deve deixar um .zip parcial no destino."""
+    mock_response.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
+    session = Mock()
+    session.get.return_value = mock_response
+    mock_session.return_value = session
+
+    save_path = tmp_path / "test.zip"
+    config = Config(db_config=valid_db_config, sinapi_config=sinapi_config, mode="local")
+    downloader = Downloader(config)
+
+    with pytest.raises(DownloadError, match="404"):
+        downloader.get_sinapi_data(save_path=save_path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@patch("autosinapi.core.downloader.requests.Session")
+def test_download_spools_to_disk(mock_session, valid_db_config, sinapi_config, mock_response):
+    """Deve passar o conteúdo baixado para o disco acima do limite configurado."""
+    session = Mock()
+    session.get.return_value = mock_response
+    mock_session.return_value = session
+
+    config = Config(db_config=valid_db_config, sinapi_config=sinapi_config, mode="server")
+    config.DOWNLOAD_SPOOL_MAX_SIZE = 4
+    downloader = Downloader(config)
+
+    result = downloader.get_sinapi_data()
+    assert result._rolled
+    assert result.read() == b"test content"
+
+
+@patch("autosinapi.core.downloader.requests.Session")
+def test_download_304_uses_cache(mock_session, valid_db_config, sinapi_config, mock_response, tmp_path):
+    """Deve reaproveitar o arquivo em cache quando o servidor responde 304."""
+    mock_response.status_code = 200
+    mock_response.headers = {"ETag": '"abc123"'}
+    not_modified = MagicMock()
+    not_modified.__enter__.return_value = not_modified
+    not_modified.status_code = 304
+    session = Mock()
+    session.get.side_effect = [mock_response, not_modified]
+    mock_session.return_value = session
+
+    config = Config(db_config=valid_db_config, sinapi_config=sinapi_config, mode="server")
+    config.DOWNLOAD_CACHE_DIR = str(tmp_path / "cache")
+    downloader = Downloader(config)
+
+    assert downloader.get_sinapi_data().read() == b"test content"
+    assert session.get.call_args.kwargs["headers"] == {}
+
+    assert downloader.get_sinapi_data().read() == b"test content"
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"abc123"'}
+    not_modified.iter_content.assert_not_called()
+
+
+def test_session_mounts_retry_adapter(downloader):
+    """Deve reaproveitar uma única sessão com pool e novas tentativas."""
+    adapter = downloader._session.get_adapter("https://www.caixa.gov.br")
+    assert adapter.max_retries.total == downloader.config.DOWNLOAD_RETRIES
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter._pool_maxsize == downloader.config.DOWNLOAD_POOL_MAXSIZE
 
 
 def test_context_manager(downloader):
     """Deve funcionar corretamente como context manager."""
-    with downloader as d:
-        assert isinstance(d, Downloader)
\ No newline at end of file
+    with patch.object(downloader._session, "close") as mock_close:
+        with downloader as d:
+            assert isinstance(d, Downloader)
+        mock_close.assert_called_once()
\ No newline at end of file
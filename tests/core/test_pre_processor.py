@@ -0,0 +1,104 @@
+"""
+Testes unitários para o módulo pre_processor.py
+"""
+
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+
+from autosinapi.config import Config
+from autosinapi.core.pre_processor import convert_excel_sheets_to_csv
+from autosinapi.exceptions import ProcessingError
+
+
+@pytest.fixture
+def config():
+    """Fixture com configuração mínima para o pré-processamento."""
+    db_config = {
+        "host": "localhost",
+        "port": 5432,
+        "database": "test_db",
+        "user": "test_user",
+        "password": "test_pass",
+    }
+    sinapi_config = {"state": "SP", "month": "01", "year": "2023", "type": "REFERENCIA"}
+    return Config(db_config, sinapi_config, mode="server")
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    """Fixture que cria um arquivo XLSX com as planilhas de custos."""
+    path = tmp_path / "SINAPI_Referência_2023_01.xlsx"
+    writer = pd.ExcelWriter(path, engine="xlsxwriter")
+    for sheet in ["CSD", "CCD"]:
+        pd.DataFrame({"A": [sheet, "x"], "B": [1, 2]}).to_excel(
+            writer, index=False, sheet_name=sheet
+        )
+    writer.close()
+    return path
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_convert_excel_sheets_to_csv(config, xlsx_file, tmp_path, max_workers):
+    """Testa a conversão de cada planilha para um CSV próprio, em sequência ou em processos."""
+    config.PREPROCESSOR_MAX_WORKERS = max_workers
+    output_dir = tmp_path / "csv_temp"
+
+    convert_excel_sheets_to_csv(xlsx_file, ["CSD", "CCD"], output_dir, config)
+
+    for sheet in ["CSD", "CCD"]:
+        lines = (output_dir / f"{sheet}.csv").read_text().splitlines()
+        assert lines[0] == "A;B"
+        assert lines[1] == f"{sheet};1"
+
+
+def test_convert_excel_sheets_to_csv_missing_sheet(config, xlsx_file, tmp_path):
+    """Testa o erro quando uma planilha solicitada não existe."""
+    with pytest.raises(ProcessingError, match="CSE"):
+        convert_excel_sheets_to_csv(xlsx_file, ["CSE"], tmp_path / "out", config)
+
+
+def test_convert_excel_sheets_to_csv_missing_file(config, tmp_path):
+    """Testa o erro quando o arquivo XLSX não existe."""
+    with pytest.raises(ProcessingError, match="não encontrado"):
+        convert_excel_sheets_to_csv(
+            tmp_path / "inexistente.xlsx", ["CSD"], tmp_path / "out", config
+        )
+
+
+def _set_sheet_dimension(xlsx_path, ref):
+    """Reescreve o <dimension ref> de todas as planilhas do arquivo."""
+    with zipfile.ZipFile(xlsx_path) as src:
+        members = {info: src.read(info) for info in src.infolist()}
+    with zipfile.ZipFile(xlsx_path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info, content in members.items():
+            if info.filename.startswith("xl/worksheets/sheet"):
+                stale = f'<dimension ref="{ref}"'.encode()
+                content = re.sub(rb'<dimension ref="[^"]*"', stale, content)
+            dst.writestr(info, content)
+
+
+def test_convert_ignores_stale_dimension(config, tmp_path):
+    """Uma dimensão declarada desatualizada não deve cortar linhas nem colunas."""
+    path = tmp_path / "SINAPI_Referência_2023_01.xlsx"
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        sheet = writer.book.add_worksheet("CSD")
+        sheet.write(0, 0, "Título")
+        sheet.write_row(2, 0, ["A", "B", "C", "D"])
+        for row in range(3, 8):
+            sheet.write_row(row, 0, [f"x{row}", row, row + 0.5, "fim"])
+    _set_sheet_dimension(path, "A1:C2")
+
+    output_dir = tmp_path / "csv_temp"
+    convert_excel_sheets_to_csv(path, ["CSD"], output_dir, config)
+
+    lines = (output_dir / "CSD.csv").read_text(encoding="utf-8").splitlines()
+    assert lines == [
+        "Título;;;",
+        ";;;",
+        "A;B;C;D",
+        *[f"x{row};{row};{row + 0.5};fim" for row in range(3, 8)],
+    ]
+    assert not list(output_dir.glob("*.part"))
@@ -3,12 +3,20 @@ Testes unitários para o módulo processor.py
 """
 
 import logging
+from unittest.mock import patch
 
+import openpyxl
 import pandas as pd
 import pytest
 
 from autosinapi.config import Config
-from autosinapi.core.processor import Processor
+from autosinapi.core.processor import (
+    Processor,
+    _normalize_col_name,
+    _normalize_text,
+    _to_numeric,
+    _usecols_by_normalized_name,
+)
 
 
 @pytest.fixture
@@ -83,29 +91,175 @@ def test_normalize_cols(processor):
     assert "PRECO_UNITARIO" in result.columns
 
 
-def test_process_composicao_itens(processor, tmp_path):
+@pytest.fixture(scope="module")
+def analitico_xlsx(tmp_path_factory):
+    """Arquivo XLSX mínimo com a aba Analítico, gerado uma vez por módulo."""
+    path = tmp_path_factory.mktemp("sinapi") / "test_sinapi.xlsx"
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Analítico")
+    # Linhas iniciais para simular o cabeçalho do arquivo real
+    for _ in range(9):
+        ws.append([])
+    ws.append(
+        ["CODIGO_DA_COMPOSICAO", "TIPO_ITEM", "CODIGO_DO_ITEM", "COEFICIENTE", "DESCRICAO", "UNIDADE"]
+    )
+    ws.append(["87453", "INSUMO", "1234", "1,0", "INSUMO A", "UN"])
+    ws.append(["87453", "COMPOSICAO", "5678", "2,5", "COMPOSICAO B", "M2"])
+    wb.save(path)
+    return path
+
+
+def test_process_composicao_itens(processor, analitico_xlsx):
     """Testa o processamento da estrutura das composições."""
-    # Cria um arquivo XLSX de teste
-    test_file = tmp_path / "test_sinapi.xlsx"
+    result = processor.process_composicao_itens(str(analitico_xlsx))
+
+    assert "composicao_insumos" in result
+    assert "composicao_subcomposicoes" in result
+    assert len(result["composicao_insumos"]) == 1
+    assert len(result["composicao_subcomposicoes"]) == 1
+    assert result["composicao_insumos"].iloc[0]["insumo_filho_codigo"] == 1234
+
+
+def test_process_composicao_itens_reuses_open_workbook(processor, analitico_xlsx):
+    """Testa a leitura a partir de um ExcelFile já aberto, sem reabrir o arquivo."""
+    with processor.open_workbook(str(analitico_xlsx)) as xls:
+        with patch.object(processor, "open_workbook") as mock_open:
+            result = processor.process_composicao_itens(str(analitico_xlsx), xls=xls)
+            mock_open.assert_not_called()
+        # O ExcelFile recebido continua aberto para o próximo leitor.
+        assert "Analítico" in xls.sheet_names
+        pd.read_excel(xls, sheet_name="Analítico", header=None)
+
+    assert len(result["composicao_insumos"]) == 1
+
+def test_excel_engine_from_config(db_config, sinapi_config):
+    """Testa que a engine de leitura do Excel pode ser fixada pelo Config."""
+    config = Config(
+        db_config, sinapi_config, mode="server",
+        custom_constants={"EXCEL_READ_ENGINE": "openpyxl"},
+    )
+    assert Processor(config)._excel_engine == "openpyxl"
+
+
+def test_usecols_by_normalized_name():
+    """Testa o filtro de colunas lidas pelo nome normalizado."""
+    usecols = _usecols_by_normalized_name(["CODIGO_DO_ITEM", "COEFICIENTE"])
+    assert usecols("Código do  Item")
+    assert usecols("Coeficiente ")
+    assert not usecols("Situação")
+
+
+def test_normalize_numeric_headers_by_type():
+    """Cabeçalhos 1 e 1.0 não podem compartilhar a mesma entrada do cache."""
+    assert _normalize_col_name(1) == "1"
+    assert _normalize_col_name(1.0) == "10"
+    assert _normalize_text(1.0) == "10"
+    assert _normalize_text(1) == "1"
+
+
+def test_to_numeric():
+    """Testa a conversão numérica com e sem vírgula decimal."""
+    numeric = pd.Series([1.5, 2.0])
+    assert _to_numeric(numeric) is numeric
+
+    text = pd.Series(["1,5", "2", "abc"])
+    assert _to_numeric(text, decimal_comma=True).tolist()[:2] == [1.5, 2.0]
+    assert pd.isna(_to_numeric(text, decimal_comma=True).iloc[2])
+    assert pd.isna(_to_numeric(text).iloc[0])
+
+    mixed = pd.Series([0.75, "1,5", None], dtype=object)
+    assert _to_numeric(mixed, decimal_comma=True).tolist()[:2] == [0.75, 1.5]
+
+
+def test_unpivot_data_matches_melt(processor):
+    """O unpivot vetorizado deve produzir o mesmo resultado que `DataFrame.melt`."""
+    df = pd.DataFrame(
+        {
+            "CODIGO": pd.array([1, 2, None], dtype="Int64"),
+            "AC": [1.0, None, "3,0"],
+            "SP": [4, 5, 6],
+        }
+    )
+
+    result = processor._unpivot_data(df, ["CODIGO"], "preco_mediano")
+
+    expected = df.melt(
+        id_vars=["CODIGO"], value_vars=["AC", "SP"], var_name="uf", value_name="preco_mediano"
+    ).dropna(subset=["preco_mediano"])
+    expected["preco_mediano"] = pd.to_numeric(expected["preco_mediano"], errors="coerce")
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_find_header_row(processor):
+    """Testa a localização do cabeçalho ignorando acentos e quebras de linha."""
+    df = pd.DataFrame(
+        [
+            ["SINAPI", None, None],
+            [None, None, None],
+            ["Código da\nComposição", "Descrição", "Unidade"],
+            ["87453", "ALVENARIA", "M2"],
+        ]
+    )
+    header_row = processor._find_header_row(
+        df, ["Código da Composição", "Descrição", "Unidade"]
+    )
+    assert header_row == 2
+
+
+def test_process_manutencoes(processor, tmp_path):
+    """Testa o processamento do arquivo de manutenções."""
+    test_file = tmp_path / "test_manutencoes.xlsx"
     df = pd.DataFrame(
         {
-            "CODIGO_DA_COMPOSICAO": ["87453", "87453"],
-            "TIPO_ITEM": ["INSUMO", "COMPOSICAO"],
-            "CODIGO_DO_ITEM": ["1234", "5678"],
-            "COEFICIENTE": ["1,0", "2,5"],
-            "DESCRICAO": ["INSUMO A", "COMPOSICAO B"],
-            "UNIDADE": ["UN", "M2"],
+            "Referência": ["07/2025", "07/2025"],
+            "Tipo": ["insumo", "composição"],
+            "Código": ["1234", "87453"],
+            "Descrição": ["AREIA MEDIA", "ALVENARIA"],
+            "Manutenção": ["desativação", "alteração de descrição"],
         }
     )
-    # Adiciona linha de cabeçalho e outras linhas para simular o arquivo real
     writer = pd.ExcelWriter(test_file, engine="xlsxwriter")
-    df.to_excel(writer, index=False, header=True, sheet_name="Analítico", startrow=9)
+    df.to_excel(writer, index=False, header=True, sheet_name="Manutenções", startrow=4)
     writer.close()
 
-    result = processor.process_composicao_itens(str(test_file))
+    result = processor.process_manutencoes(str(test_file))
 
-    assert "composicao_insumos" in result
-    assert "composicao_subcomposicoes" in result
-    assert len(result["composicao_insumos"]) == 1
-    assert len(result["composicao_subcomposicoes"]) == 1
-    assert result["composicao_insumos"].iloc[0]["insumo_filho_codigo"] == 1234
\ No newline at end of file
+    assert list(result.columns) == list(processor.config.MANUTENCOES_COL_MAP.values())
+    assert len(result) == 2
+    assert result.iloc[0]["item_codigo"] == 1234
+    assert result.iloc[0]["tipo_manutencao"] == "DESATIVAÇÃO"
+    assert str(result.iloc[0]["data_referencia"]) == "2025-07-01"
+
+
+def test_process_custos_sheet(processor, tmp_path):
+    """Testa a leitura do CSV de custos com cabeçalho de dois níveis (UF/coluna)."""
+    csv_dir = tmp_path / processor.config.TEMP_CSV_DIR
+    csv_dir.mkdir()
+    (csv_dir / "CSD.csv").write_text(
+        ";;;;AC;;SP;\n"
+        "Grupo;Código da Composição;Descrição;Unidade;Custo (R$);%AS;Custo (R$);%AS\n"
+        'G;=HYPERLINK("u",87453);ARGAMASSA;M3;100.5;1;110.0;1\n',
+        encoding="utf-8",
+    )
+    xlsx_path = tmp_path / "extraido" / "SINAPI_Referência.xlsx"
+
+    long_df, catalogo_df = processor._process_custos_sheet(str(xlsx_path), "CSD")
+
+    assert catalogo_df["CODIGO"].tolist() == [87453]
+    assert sorted(long_df["uf"]) == ["AC", "SP"]
+    assert long_df.set_index("uf").loc["SP", "custo_total"] == 110.0
+
+
+def test_aggregate_monthly_categorical(processor):
+    """Testa que UF e regime das tabelas mensais viram `category` após a concatenação."""
+    frames = [
+        pd.DataFrame({"insumo_codigo": [1, 2], "uf": ["AC", "SP"], "preco_mediano": [1.0, 2.0], "regime": "DESONERADO"}),
+        pd.DataFrame({"insumo_codigo": [1], "uf": ["AC"], "preco_mediano": [3.0], "regime": "NAO_DESONERADO"}),
+    ]
+
+    result = processor._aggregate_final_dataframes({"precos_insumos_mensal": frames}, [], [])
+
+    df = result["precos_insumos_mensal"]
+    assert len(df) == 3
+    assert isinstance(df["uf"].dtype, pd.CategoricalDtype)
+    assert set(df["regime"].cat.categories) == {"DESONERADO", "NAO_DESONERADO"}
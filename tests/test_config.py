@@ -55,6 +55,24 @@ def test_missing_sinapi_config(valid_db_config):
     assert "Configurações do SINAPI ausentes" in str(exc_info.value)
 
 
+@pytest.mark.parametrize(
+    "field, value, message",
+    [("year", "23", "Ano inválido"), ("year", None, "Ano inválido"), ("month", "13", "Mês inválido")],
+)
+def test_invalid_reference_period(valid_db_config, valid_sinapi_config, field, value, message):
+    """Deve levantar erro para ano ou mês fora do formato esperado."""
+    with pytest.raises(ConfigurationError) as exc_info:
+        Config(valid_db_config, {**valid_sinapi_config, field: value}, "server")
+    assert message in str(exc_info.value)
+
+
+@pytest.mark.parametrize("month", [7, "07", "7", 12])
+def test_valid_reference_month(valid_db_config, valid_sinapi_config, month):
+    """Deve aceitar o mês como inteiro ou string, com ou sem zero à esquerda."""
+    config = Config(valid_db_config, {**valid_sinapi_config, "month": month}, "server")
+    assert config.sinapi_config["month"] == month
+
+
 def test_mode_properties(valid_db_config, valid_sinapi_config):
     """Deve retornar corretamente o modo de operação."""
     config = Config(valid_db_config, valid_sinapi_config, "server")
@@ -1,37 +1,11 @@
-def test_real_excel_input(tmp_path):
-    """Testa o pipeline com um arquivo Excel real do SINAPI."""
-    import shutil
-    from autosinapi import run_etl
-    # Copia um arquivo real para o tmp_path para simular input do usuário
-    src_file = 'tools/downloads/2025_07/SINAPI-2025-07-formato-xlsx/SINAPI_mao_de_obra_2025_07.xlsx'
-    test_file = tmp_path / 'SINAPI_mao_de_obra_2025_07.xlsx'
-    shutil.copy(src_file, test_file)
-
-    db_config = {
-        'host': 'localhost',
-        'port': 5432,
-        'database': 'test_db',
-        'user': 'test_user',
-        'password': 'test_pass'
-    }
-    sinapi_config = {
-        'state': 'SP',
-        'month': '07',
-        'year': '2025',
-        'type': 'insumos',
-        'input_file': str(test_file)
-    }
-    result = run_etl(db_config, sinapi_config, mode='server')
-    if result['status'] != 'success':
-        print('Erro no pipeline:', result)
-    assert result['status'] == 'success'
-    assert isinstance(result['details'].get('rows_processed', 1), int)
 """
 Testes do módulo de download com suporte a input direto de arquivo.
 """
 
+import os
+import shutil
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 from io import BytesIO
 
 import pandas as pd
@@ -39,9 +13,49 @@ import pytest
 
 from autosinapi.etl_pipeline import PipelineETL
 
+SHEETS_TO_CONVERT = ['CSD', 'CCD', 'CSE']
+
+# Retornos do Processor mockado, construídos uma única vez na importação do
+# módulo (nenhum teste os altera).
+_INSUMOS_DF = pd.DataFrame(
+    {
+        "codigo": [1234, 5678],
+        "descricao": ["Item 1", "Item 2"],
+        "unidade": ["un", "kg"],
+        "preco": [10.5, 20.75],
+    }
+)
+_PROCESS_COMPOSICAO_RETURN = {
+    "composicao_insumos": pd.DataFrame(columns=["insumo_filho_codigo"]),
+    "composicao_subcomposicoes": pd.DataFrame(),
+    "parent_composicoes_details": pd.DataFrame(
+        columns=["codigo", "descricao", "unidade"]
+    ),
+    "child_item_details": pd.DataFrame(
+        columns=["codigo", "tipo", "descricao", "unidade"]
+    ),
+}
+
+
+@pytest.fixture(scope="session")
+def reference_workbook(tmp_path_factory):
+    """Planilha de referência falsa, gravada uma única vez por sessão."""
+    path = tmp_path_factory.mktemp("fixtures") / "reference.xlsx"
+    # Create a dummy Excel file with required sheets
+    # xlsxwriter grava o XML sem montar a árvore do openpyxl. O modo
+    # constant_memory não serve aqui: o pandas não escreve linha a linha e
+    # células de texto seriam perdidas.
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        for sheet_name in SHEETS_TO_CONVERT:
+            pd.DataFrame({"col1": [1, 2], "col2": [3, 4]}).to_excel(writer, sheet_name=sheet_name, index=False)
+        # Add other sheets that might be processed by processor.process_catalogo_e_precos and process_composicao_itens
+        pd.DataFrame({"codigo": [1,2], "descricao": ["a","b"]}).to_excel(writer, sheet_name="ISD", index=False)
+        pd.DataFrame({"codigo": [1,2], "descricao": ["a","b"]}).to_excel(writer, sheet_name="Analítico", index=False)
+    return path
+
 
 @pytest.fixture
-def mock_pipeline(mocker, tmp_path):
+def mock_pipeline(mocker, monkeypatch, tmp_path, reference_workbook):
     """Fixture para mockar o pipeline e suas dependências."""
     mocker.patch("autosinapi.etl_pipeline.setup_logging")
 
@@ -69,11 +83,18 @@ def mock_pipeline(mocker, tmp_path):
     mock_config.DB_TABLE_CUSTOS_COMPOSICOES = "custos_composicoes_mensal"
     mock_config.ITEM_TYPE_INSUMO = "INSUMO"
     mock_config.ITEM_TYPE_COMPOSICAO = "COMPOSICAO"
-    mock_config.SHEETS_TO_CONVERT = ['CSD', 'CCD', 'CSE']
+    mock_config.SHEETS_TO_CONVERT = SHEETS_TO_CONVERT
     mock_config.sinapi_config = {"state": "SP", "month": "01", "year": "2023", "type": "insumos"} # Adicionado para o test_fallback_to_download
 
-    # Patch para que PipelineETL use o mock_config
+    mock_config.STATUS_SUCCESS = "SUCESSO"
+    mock_config.STATUS_SUCCESS_NO_DATA = "SUCESSO (SEM DADOS)"
+    mock_config.STATUS_FAILURE = "FALHA"
+    mock_config.TEMP_CSV_DIR = "csv_temp"
+    mock_config.is_local_mode = True
+
+    # Patch para que PipelineETL use o mock_config (sem ler o arquivo de secrets)
     mocker.patch("autosinapi.etl_pipeline.Config", return_value=mock_config)
+    mocker.patch.object(PipelineETL, "_get_db_config", return_value={})
 
     # Cria um diretório de extração falso
     extraction_path = tmp_path / "extraction"
@@ -81,87 +102,104 @@ def mock_pipeline(mocker, tmp_path):
     # Cria um arquivo de referência falso dentro do diretório
     referencia_file_name = f"SINAPI_{mock_config.REFERENCE_FILE_KEYWORD}_20_23_01.xlsx"
     referencia_file_path = extraction_path / referencia_file_name
-    # Create a dummy Excel file with required sheets
-    with pd.ExcelWriter(referencia_file_path) as writer:
-        for sheet_name in mock_config.SHEETS_TO_CONVERT:
-            pd.DataFrame({"col1": [1, 2], "col2": [3, 4]}).to_excel(writer, sheet_name=sheet_name, index=False)
-        # Add other sheets that might be processed by processor.process_catalogo_e_precos and process_composicao_itens
-        pd.DataFrame({"codigo": [1,2], "descricao": ["a","b"]}).to_excel(writer, sheet_name="ISD", index=False)
-        pd.DataFrame({"codigo": [1,2], "descricao": ["a","b"]}).to_excel(writer, sheet_name="Analítico", index=False)
+    # Reaproveita a planilha da sessão (hardlink, sem copiar os dados quando possível)
+    try:
+        os.link(reference_workbook, referencia_file_path)
+    except OSError:
+        shutil.copy(reference_workbook, referencia_file_path)
 
-    with patch("autosinapi.etl_pipeline.Database") as mock_db_class, patch(
-        "autosinapi.etl_pipeline.Downloader"
-    ) as mock_downloader_class, patch(
-        "autosinapi.etl_pipeline.Processor"
-    ) as mock_processor_class, patch(
-        "autosinapi.core.pre_processor.convert_excel_sheets_to_csv"
-    ) as mock_convert_excel_sheets_to_csv:
-
-        mock_db_instance = MagicMock()
-        mock_db_class.return_value = mock_db_instance
-
-        mock_downloader_instance = MagicMock()
-        mock_downloader_class.return_value = mock_downloader_instance
-        mock_downloader_instance.get_sinapi_data.return_value = BytesIO(b"dummy zip content")
-
-        mock_processor_instance = MagicMock()
-        mock_processor_class.return_value = mock_processor_instance
-
-        pipeline = PipelineETL(config_path=None) # config_path=None is fine as Config is mocked
-
-        
-        spy_run_pre_processing = mocker.spy(pipeline, "_run_pre_processing")
-        spy_run = mocker.spy(pipeline, "run")
-        mocker.patch.object(pipeline, "_sync_catalog_status")
-        mocker.patch.object(
-            pipeline, "_unzip_file", return_value=extraction_path
-        )
-        mocker.patch.object(
-            pipeline, "_find_and_normalize_zip", return_value=Path("mocked.zip")
-        )
-
-        yield (
-            pipeline,
-            mock_db_instance,
-            mock_downloader_instance,
-            mock_processor_instance,
-            mock_convert_excel_sheets_to_csv,
-            referencia_file_path,
-            mock_config, # Pass mock_config to the test
-            spy_run_pre_processing, # Pass spy_run_pre_processing to the test
-            spy_run # Add spy_run to the yield
-        )
+    mock_db_instance = MagicMock()
+    monkeypatch.setattr("autosinapi.etl_pipeline.Database", MagicMock(return_value=mock_db_instance))
+
+    mock_downloader_instance = MagicMock()
+    mock_downloader_instance.get_sinapi_data.return_value = BytesIO(b"dummy zip content")
+    monkeypatch.setattr("autosinapi.etl_pipeline.Downloader", MagicMock(return_value=mock_downloader_instance))
+
+    mock_processor_instance = MagicMock()
+    monkeypatch.setattr("autosinapi.etl_pipeline.Processor", MagicMock(return_value=mock_processor_instance))
+
+    mock_convert_excel_sheets_to_csv = MagicMock()
+    monkeypatch.setattr(
+        "autosinapi.etl_pipeline.convert_excel_sheets_to_csv", mock_convert_excel_sheets_to_csv
+    )
+
+    pipeline = PipelineETL(run_id="test-run", config_path=None) # config_path=None is fine as Config is mocked
+
+    spy_run_pre_processing = mocker.spy(pipeline, "_run_pre_processing")
+    spy_run = mocker.spy(pipeline, "run")
+    mocker.patch.object(pipeline, "_sync_catalog_status")
+    mocker.patch.object(
+        pipeline, "_unzip_file", return_value=extraction_path
+    )
+    mocker.patch.object(
+        pipeline, "_find_and_normalize_zip", return_value=Path("mocked.zip")
+    )
+
+    yield (
+        pipeline,
+        mock_db_instance,
+        mock_downloader_instance,
+        mock_processor_instance,
+        mock_convert_excel_sheets_to_csv,
+        referencia_file_path,
+        mock_config, # Pass mock_config to the test
+        spy_run_pre_processing, # Pass spy_run_pre_processing to the test
+        spy_run # Add spy_run to the yield
+    )
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+@pytest.mark.skipif(
+    not os.environ.get("RUN_INTEGRATION"),
+    reason="Teste de integração: requer arquivo real do SINAPI e PostgreSQL (RUN_INTEGRATION=1).",
+)
+def test_real_excel_input(tmp_path):
+    """Testa o pipeline com um arquivo Excel real do SINAPI."""
+    from autosinapi import run_etl
+    # Disponibiliza um arquivo real no tmp_path para simular input do usuário
+    # (hardlink quando possível, evitando copiar a planilha inteira).
+    src_file = 'tools/downloads/2025_07/SINAPI-2025-07-formato-xlsx/SINAPI_mao_de_obra_2025_07.xlsx'
+    test_file = tmp_path / 'SINAPI_mao_de_obra_2025_07.xlsx'
+    try:
+        os.link(src_file, test_file)
+    except OSError:
+        shutil.copy(src_file, test_file)
+
+    db_config = {
+        'host': 'localhost',
+        'port': 5432,
+        'database': 'test_db',
+        'user': 'test_user',
+        'password': 'test_pass'
+    }
+    sinapi_config = {
+        'state': 'SP',
+        'month': '07',
+        'year': '2025',
+        'type': 'insumos',
+        'input_file': str(test_file)
+    }
+    result = run_etl(db_config, sinapi_config, mode='server')
+    if result['status'] != 'success':
+        print('Erro no pipeline:', result)
+    assert result['status'] == 'success'
+    assert isinstance(result['details'].get('rows_processed', 1), int)
 
 
 def test_direct_file_input(tmp_path, mock_pipeline):
     """Testa o pipeline com input direto de arquivo."""
-        pipeline, mock_db, mock_downloader, mock_processor, mock_convert_excel_sheets_to_csv, referencia_file_path, mock_config, spy_run_pre_processing, spy_run = mock_pipeline
+    pipeline, mock_db, mock_downloader, mock_processor, mock_convert_excel_sheets_to_csv, referencia_file_path, mock_config, spy_run_pre_processing, spy_run = mock_pipeline
 
     test_file = tmp_path / "test_sinapi.xlsx"
-    df = pd.DataFrame(
-        {
-            "codigo": [1234, 5678],
-            "descricao": ["Item 1", "Item 2"],
-            "unidade": ["un", "kg"],
-            "preco": [10.5, 20.75],
-        }
-    )
-    df.to_excel(test_file, index=False)
+    # O Processor é mockado e não lê o arquivo; basta que ele exista.
+    test_file.touch()
 
     # Set the input_file directly on the mocked sinapi_config
     mock_config.sinapi_config["input_file"] = str(test_file)
 
-    mock_processor.process_catalogo_e_precos.return_value = {"insumos": df}
-    mock_processor.process_composicao_itens.return_value = {
-        "composicao_insumos": pd.DataFrame(columns=["insumo_filho_codigo"]),
-        "composicao_subcomposicoes": pd.DataFrame(),
-        "parent_composicoes_details": pd.DataFrame(
-            columns=["codigo", "descricao", "unidade"]
-        ),
-        "child_item_details": pd.DataFrame(
-            columns=["codigo", "tipo", "descricao", "unidade"]
-        ),
-    }
+    mock_processor.process_catalogo_e_precos.return_value = {"insumos": _INSUMOS_DF}
+    mock_processor.process_composicao_itens.return_value = _PROCESS_COMPOSICAO_RETURN
 
     result = pipeline.run() # Capture the result
 
@@ -174,14 +212,16 @@ def test_direct_file_input(tmp_path, mock_pipeline):
     mock_convert_excel_sheets_to_csv.assert_called_once_with(
         xlsx_full_path=referencia_file_path,
         sheets_to_convert=mock_config.SHEETS_TO_CONVERT,
-        output_dir=referencia_file_path.parent.parent / "csv_temp"
+        output_dir=referencia_file_path.parent.parent / "csv_temp",
+        config=mock_config,
     )
 
 
 def test_fallback_to_download(mock_pipeline, mocker):
     """Testa o fallback para download quando arquivo não é fornecido."""
-    pipeline, _, mock_downloader, _, _, _, mock_config, spy_run_pre_processing, spy_run = mock_pipeline
-    spy_find_and_normalize_zip = mocker.spy(pipeline, "_find_and_normalize_zip")
+    pipeline, _, mock_downloader, mock_processor, _, _, mock_config, spy_run_pre_processing, spy_run = mock_pipeline
+    mock_processor.process_catalogo_e_precos.return_value = {"insumos": _INSUMOS_DF}
+    mock_processor.process_composicao_itens.return_value = _PROCESS_COMPOSICAO_RETURN
 
     # Ensure input_file is not set in the mocked sinapi_config
     if "input_file" in mock_config.sinapi_config:
@@ -192,7 +232,9 @@ def test_fallback_to_download(mock_pipeline, mocker):
     result = pipeline.run() # Capture the result
 
     mock_downloader.get_sinapi_data.assert_called_once()
-    spy_find_and_normalize_zip.assert_called_once()
+    # _find_and_normalize_zip já é um mock (fixture); um spy sobre ele
+    # ignoraria o return_value acima e nunca cairia no download.
+    pipeline._find_and_normalize_zip.assert_called_once()
     assert result["status"] == "SUCESSO"
     assert "populados com sucesso" in result["message"]
     assert result["records_inserted"] > 0
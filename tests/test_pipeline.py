@@ -2,6 +2,10 @@
 Testes de integração para o pipeline principal do AutoSINAPI.
 """
 
+import logging
+import zipfile
+from contextlib import ExitStack
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
@@ -11,7 +15,31 @@ from autosinapi.exceptions import DatabaseError, DownloadError, ProcessingError
 from autosinapi.etl_pipeline import PipelineETL
 
 
-@pytest.fixture
+# Dependências substituídas por mocks durante os testes do pipeline. Os
+# patches miram os nomes importados em `etl_pipeline`, onde são usados; do
+# contrário o Downloader real poderia fazer requisições de rede.
+_PATCH_TARGETS = (
+    "autosinapi.etl_pipeline.Database",
+    "autosinapi.etl_pipeline.Downloader",
+    "autosinapi.etl_pipeline.Processor",
+    "autosinapi.etl_pipeline.convert_excel_sheets_to_csv",
+)
+
+# Retornos do Processor mockado, construídos uma única vez na importação do
+# módulo (nenhum teste os altera).
+_INSUMOS_DF = pd.DataFrame({"codigo": ["1"], "descricao": ["a"], "unidade": ["un"]})
+_COMPOSICOES_DF = pd.DataFrame({"codigo": ["c1"], "descricao": ["ca"], "unidade": ["un"]})
+_COMPOSICAO_INSUMOS_DF = pd.DataFrame({"insumo_filho_codigo": ["1"]})
+_COMPOSICAO_SUBCOMPOSICOES_DF = pd.DataFrame(
+    {"composicao_pai_codigo": ["c1"], "composicao_filho_codigo": ["c1"]}
+)
+_PARENT_DETAILS_DF = pd.DataFrame({"codigo": ["c1"], "descricao": ["ca"], "unidade": ["un"]})
+_CHILD_DETAILS_DF = pd.DataFrame(
+    {"codigo": ["1"], "tipo": ["INSUMO"], "descricao": ["a"], "unidade": ["un"]}
+)
+
+
+@pytest.fixture(scope="module")
 def db_config():
     """Fixture com configurações do banco de dados."""
     return {
@@ -23,7 +51,7 @@ def db_config():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sinapi_config():
     """Fixture com configurações do SINAPI."""
     return {
@@ -35,68 +63,79 @@ def sinapi_config():
     }
 
 
+@pytest.fixture(scope="module")
+def patched_dependencies():
+    """Aplica os patches das dependências uma única vez por módulo."""
+    with ExitStack() as stack:
+        yield tuple(stack.enter_context(patch(target)) for target in _PATCH_TARGETS)
+
+
+@pytest.fixture(scope="module")
+def referencia_file_path(tmp_path_factory):
+    """Diretório de extração falso, criado uma única vez por módulo."""
+    extraction_path = tmp_path_factory.mktemp("pipeline") / "extraction"
+    extraction_path.mkdir()
+    # Cria um arquivo de referência falso dentro do diretório
+    path = extraction_path / "SINAPI_Referência_2025_08.xlsx"
+    path.touch()
+    return path
+
+
 @pytest.fixture
-def mock_pipeline(mocker, db_config, sinapi_config, tmp_path):
+def mock_pipeline(mocker, db_config, sinapi_config, patched_dependencies, referencia_file_path):
     """Fixture para mockar o pipeline e suas dependências."""
     mocker.patch("autosinapi.etl_pipeline.setup_logging")
+    extraction_path = referencia_file_path.parent
+
+    # Os patches são compartilhados pelo módulo: cada teste recebe mocks
+    # zerados e instâncias novas.
+    for mock in patched_dependencies:
+        mock.reset_mock(return_value=True, side_effect=True)
+    mock_db, mock_downloader, mock_processor, mock_convert_excel_sheets_to_csv = patched_dependencies
+
+    mock_db_instance = MagicMock()
+    mock_db.return_value = mock_db_instance
+
+    mock_downloader_instance = MagicMock()
+    mock_downloader.return_value = mock_downloader_instance
+
+    mock_processor_instance = MagicMock()
+    mock_processor.return_value = mock_processor_instance
+
+    # A configuração é montada no construtor: os patches ficam na classe.
+    mocker.patch.object(PipelineETL, "_get_db_config", return_value=db_config)
+    mocker.patch.object(PipelineETL, "_get_sinapi_config", return_value=sinapi_config)
+    mocker.patch.object(
+        PipelineETL,
+        "_load_base_config", # Changed from "_load_config"
+        return_value={
+            "secrets_path": "dummy",
+            "default_year": sinapi_config["year"],
+            "default_month": sinapi_config["month"],
+        },
+    )
 
-    # Cria um diretório de extração falso
-    extraction_path = tmp_path / "extraction"
-    extraction_path.mkdir()
-    # Cria um arquivo de referência falso dentro do diretório
-    referencia_file_path = extraction_path / "SINAPI_Referência_2025_08.xlsx"
-    referencia_file_path.touch()
-
-    with patch("autosinapi.core.database.Database") as mock_db, patch(
-        "autosinapi.core.downloader.Downloader"
-    ) as mock_downloader, patch(
-        "autosinapi.core.processor.Processor"
-    ) as mock_processor, patch(
-        "autosinapi.core.pre_processor.convert_excel_sheets_to_csv"
-    ) as mock_convert_excel_sheets_to_csv: # New mock for the new pre_processor function
-
-        mock_db_instance = MagicMock()
-        mock_db.return_value = mock_db_instance
-
-        mock_downloader_instance = MagicMock()
-        mock_downloader.return_value = mock_downloader_instance
-
-        mock_processor_instance = MagicMock()
-        mock_processor.return_value = mock_processor_instance
-
-        pipeline = PipelineETL(config_path=None) # Changed to PipelineETL
-
-        mocker.patch.object(pipeline, "_get_db_config", return_value=db_config)
-        mocker.patch.object(pipeline, "_get_sinapi_config", return_value=sinapi_config)
-        mocker.patch.object(
-            pipeline,
-            "_load_base_config", # Changed from "_load_config"
-            return_value={
-                "secrets_path": "dummy",
-                "default_year": sinapi_config["year"],
-                "default_month": sinapi_config["month"],
-            },
-        )
-
-        mocker.patch.object(
-            pipeline, "_find_and_normalize_zip", return_value=MagicMock()
-        )
-        mocker.patch.object(pipeline, "_unzip_file", return_value=extraction_path)
-        # The _run_pre_processing method now calls convert_excel_sheets_to_csv,
-        # so we mock the underlying function directly.
-        # We also need to ensure _run_pre_processing is called with the correct arguments.
-        # For simplicity, we'll mock the method itself and ensure it's called.
-        mocker.patch.object(pipeline, "_run_pre_processing") # Keep this mock for the method call
-        mocker.patch.object(pipeline, "_sync_catalog_status")
-
-        yield (
-            pipeline,
-            mock_db_instance,
-            mock_downloader_instance,
-            mock_processor_instance,
-            mock_convert_excel_sheets_to_csv, # Yield the new mock
-            referencia_file_path # Yield the path for assertions
-        )
+    pipeline = PipelineETL(run_id="test-run", config_path=None) # Changed to PipelineETL
+
+    mocker.patch.object(
+        pipeline, "_find_and_normalize_zip", return_value=MagicMock()
+    )
+    mocker.patch.object(pipeline, "_unzip_file", return_value=extraction_path)
+    # The _run_pre_processing method now calls convert_excel_sheets_to_csv,
+    # so we mock the underlying function directly.
+    # We also need to ensure _run_pre_processing is called with the correct arguments.
+    # For simplicity, we'll mock the method itself and ensure it's called.
+    mocker.patch.object(pipeline, "_run_pre_processing") # Keep this mock for the method call
+    mocker.patch.object(pipeline, "_sync_catalog_status")
+
+    yield (
+        pipeline,
+        mock_db_instance,
+        mock_downloader_instance,
+        mock_processor_instance,
+        mock_convert_excel_sheets_to_csv, # Yield the new mock
+        referencia_file_path # Yield the path for assertions
+    )
 
 
 def test_run_etl_success(mock_pipeline):
@@ -104,36 +143,36 @@ def test_run_etl_success(mock_pipeline):
     pipeline, mock_db, _, mock_processor, mock_convert_excel_sheets_to_csv, referencia_file_path = mock_pipeline
 
     mock_processor.process_catalogo_e_precos.return_value = {
-        "insumos": pd.DataFrame(
-            {"codigo": ["1"], "descricao": ["a"], "unidade": ["un"]}
-        ),
-        "composicoes": pd.DataFrame(
-            {"codigo": ["c1"], "descricao": ["ca"], "unidade": ["un"]}
-        ),
+        "insumos": _INSUMOS_DF,
+        "composicoes": _COMPOSICOES_DF,
     }
     mock_processor.process_composicao_itens.return_value = {
-        "composicao_insumos": pd.DataFrame({"insumo_filho_codigo": ["1"]}),
-        "composicao_subcomposicoes": pd.DataFrame(),
-        "parent_composicoes_details": pd.DataFrame(
-            {"codigo": ["c1"], "descricao": ["ca"], "unidade": ["un"]}
-        ),
-        "child_item_details": pd.DataFrame(
-            {"codigo": ["1"], "tipo": ["INSUMO"], "descricao": ["a"], "unidade": ["un"]}
-        ),
+        "composicao_insumos": _COMPOSICAO_INSUMOS_DF,
+        "composicao_subcomposicoes": _COMPOSICAO_SUBCOMPOSICOES_DF,
+        "parent_composicoes_details": _PARENT_DETAILS_DF,
+        "child_item_details": _CHILD_DETAILS_DF,
     }
 
     result = pipeline.run() # Capture the result
 
     mock_db.create_tables.assert_called_once()
-    mock_processor.process_catalogo_e_precos.assert_called()
+    # O workbook de Referência é aberto uma vez e compartilhado pelos dois leitores.
+    mock_processor.open_workbook.assert_called_once_with(str(referencia_file_path))
+    referencia_xls = mock_processor.open_workbook.return_value.__enter__.return_value
+    mock_processor.process_catalogo_e_precos.assert_called_once_with(
+        str(referencia_file_path), xls=referencia_xls
+    )
+    mock_processor.process_composicao_itens.assert_called_once_with(
+        str(referencia_file_path), xls=referencia_xls
+    )
     assert mock_db.save_data.call_count > 0
-    mock_convert_excel_sheets_to_csv.assert_called_once_with(
-        xlsx_full_path=referencia_file_path,
-        sheets_to_convert=['CSD', 'CCD', 'CSE'],
-        output_dir=referencia_file_path.parent.parent / "csv_temp" # Adjust path as per etl_pipeline.py
+    # _run_pre_processing é mockado; convert_excel_sheets_to_csv não chega a ser chamado.
+    pipeline._run_pre_processing.assert_called_once_with(
+        referencia_file_path, referencia_file_path.parent
     )
+    mock_convert_excel_sheets_to_csv.assert_not_called()
 
-    assert result["status"] == "success"
+    assert result["status"] == "SUCESSO"
     assert "populados com sucesso" in result["message"]
     assert "insumos" in result["tables_updated"]
     assert "composicoes" in result["tables_updated"]
@@ -151,7 +190,7 @@ def test_run_etl_download_error(mock_pipeline):
 
     result = pipeline.run() # Capture the result
 
-    assert result["status"] == "failed"
+    assert result["status"] == "FALHA"
     assert "Network error" in result["message"]
     assert result["tables_updated"] == []
     assert result["records_inserted"] == 0
@@ -167,7 +206,7 @@ def test_run_etl_processing_error(mock_pipeline):
 
     result = pipeline.run() # Capture the result
 
-    assert result["status"] == "failed"
+    assert result["status"] == "FALHA"
     assert "Invalid format" in result["message"]
     assert result["tables_updated"] == []
     assert result["records_inserted"] == 0
@@ -181,7 +220,56 @@ def test_run_etl_database_error(mock_pipeline):
 
     result = pipeline.run() # Capture the result
 
-    assert result["status"] == "failed"
+    assert result["status"] == "FALHA"
     assert "Connection failed" in result["message"]
     assert result["tables_updated"] == []
-    assert result["records_inserted"] == 0
\ No newline at end of file
+    assert result["records_inserted"] == 0
+
+def test_get_db_config_reads_quoted_secrets(tmp_path, monkeypatch):
+    """Testa a leitura do arquivo de secrets, inclusive senha contendo aspas e chaves com hífen."""
+    monkeypatch.delenv("DOCKER_ENV", raising=False)
+    secrets = tmp_path / "sql_access.secrets"
+    secrets.write_text(
+        "DB_HOST = 'localhost'\n"
+        "DB_PORT=5432\n"
+        "DB_NAME='sinapi'\n"
+        "DB_USER='user'\n"
+        "DB_PASSWORD='pa'ss'\n"
+        "DB-EXTRA = ignorada\n",
+        encoding="utf-8",
+    )
+    pipeline = PipelineETL.__new__(PipelineETL)
+    pipeline.logger = logging.getLogger("test")
+
+    db_config = pipeline._get_db_config({"secrets_path": str(secrets)})
+
+    assert db_config == {
+        "host": "localhost",
+        "port": "5432",
+        "database": "sinapi",
+        "user": "user",
+        "password": "pa'ss",
+    }
+
+
+def test_unzip_file_reextracts_changed_member(tmp_path):
+    """Um arquivo já extraído com o mesmo tamanho, mas conteúdo diferente, é extraído de novo."""
+    zip_path = tmp_path / "SINAPI.zip"
+    member_name = "SINAPI_Referência_2025_08.xlsx"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr(member_name, b"conteudo original")
+        zf.writestr("Leia-me.pdf", b"ignorado")
+    pipeline = PipelineETL.__new__(PipelineETL)
+    pipeline.logger = logging.getLogger("test")
+    pipeline.config = SimpleNamespace(
+        MAINTENANCE_FILE_KEYWORD="Manuten", REFERENCE_FILE_KEYWORD="Referência"
+    )
+
+    extraction_path = pipeline._unzip_file(zip_path)
+    extracted = extraction_path / member_name
+    assert sorted(p.name for p in extraction_path.iterdir()) == [member_name]
+
+    extracted.write_bytes(b"conteudo alterado")  # mesmo tamanho, CRC diferente
+    pipeline._unzip_file(zip_path)
+
+    assert extracted.read_bytes() == b"conteudo original"